@@ -1,13 +1,25 @@
 import streamlit as st
 import pandas as pd
 from router import route_query_to_tool
-from tools import TOOL_FUNCTIONS
+from tools import TOOL_FUNCTIONS, COLUMN_RESOLVERS, PROFILE_VERSION, ResultMemo, apply_theme, build_profile
+from dataset_cache import DatasetCache, content_hash
+from ingest import read_csv_chunked
+from store import open_store
+from executor import open_executor
 
 import base64
+from functools import partial
 
 # Set Streamlit config
 st.set_page_config(page_title="CSV Explorer", layout="centered")
 
+# Plot styling is global, so it is set once here rather than by each tool
+apply_theme()
+
+# Sessions share one copy of each dataset; with copy-on-write, an edit made
+# through one session's view copies the data instead of changing it for everyone
+pd.set_option("mode.copy_on_write", True)
+
 # === Add Background & Styling ===
 def add_bg_from_local(image_file):
     with open(image_file, "rb") as f:
@@ -85,15 +97,102 @@ def add_bg_from_local(image_file):
 # 🐝 Add background (path to saved image)
 add_bg_from_local("bgg.jpg")
 
+# === Dataset Cache & Store ===
+@st.cache_resource
+def get_dataset_cache():
+    # One cache per server process, shared by every rerun and session
+    return DatasetCache()
+
+@st.cache_resource
+def get_dataset_store():
+    # Columnar copies of past uploads; None when pyarrow isn't installed
+    return open_store()
+
+@st.cache_resource
+def get_executor():
+    # Worker processes for compute stages, sharing datasets through the store;
+    # None (compute in the script thread) without a store or with CSV_EXPLORER_WORKERS=0
+    return open_executor(get_dataset_store())
+
+@st.cache_resource
+def get_result_memo():
+    # Computed results and rendered figure bytes, keyed by dataset hash, tool and parameters
+    return ResultMemo()
+
+def dataset_key(uploaded_file):
+    """Content hash of the upload, computed once per uploaded file."""
+    keys = st.session_state.setdefault("dataset_keys", {})
+    if uploaded_file.file_id not in keys:
+        keys[uploaded_file.file_id] = content_hash(uploaded_file.getvalue())
+    return keys[uploaded_file.file_id]
+
+def leased_frame(key):
+    """This session's read-only view of the shared frame for `key`, or None if it isn't cached.
+
+    The session keeps its lease between reruns, which pins the frame in the
+    shared cache; switching datasets or closing the session releases it.
+    """
+    held = st.session_state.get("dataset_lease")
+    if held is not None and held[0] == key:
+        return held[1]
+    view = get_dataset_cache().lease(key)
+    if view is not None:
+        st.session_state["dataset_lease"] = (key, view)
+    return view
+
+def load_frame(uploaded_file, key, columns=None):
+    """Return the dataset, or just `columns` of it, parsing the CSV only if it was never stored."""
+    cache, store = get_dataset_cache(), get_dataset_store()
+    df = leased_frame(key)
+    if df is not None:
+        return df if columns is None else df[columns]
+    if store is not None and key in store:
+        if columns is not None:
+            # Only the requested columns are paged in from the memory-mapped file
+            return store.read(key, columns)
+        df = cache.put(key, store.read(key))
+    else:
+        df, ingest_stats = read_csv_chunked(uploaded_file)
+        st.session_state["ingest_stats"] = (key, ingest_stats)
+        if store is not None:
+            store.put(key, df)
+        cache.put(key, df)
+
+    # Frames too large for the cache aren't retained, so there is nothing to lease
+    view = leased_frame(key)
+    df = df if view is None else view
+    return df if columns is None else df[columns]
+
+@st.cache_resource(max_entries=64)
+def load_profile(key, _uploaded_file):
+    """Column metadata for the dataset, built once per content hash and shared by all tools."""
+    store = get_dataset_store()
+    profile = store.read_profile(key, PROFILE_VERSION) if store is not None else None
+    if profile is None:
+        profile = build_profile(load_frame(_uploaded_file, key))
+        if store is not None and key in store:
+            store.put_profile(key, profile, PROFILE_VERSION)
+    return profile
+
+def load_preview(uploaded_file, key):
+    store = get_dataset_store()
+    if key not in get_dataset_cache() and store is not None and key in store:
+        return store.head(key)
+    return load_frame(uploaded_file, key).head()
+
 # === Streamlit App Logic ===
 st.title("📊CSV Explorer")
 
 uploaded_file = st.file_uploader("Upload CSV", type="csv")
 
 if uploaded_file:
-    df = pd.read_csv(uploaded_file)
+    key = dataset_key(uploaded_file)
+    preview = load_preview(uploaded_file, key)
     st.success("CSV uploaded successfully!")
-    st.dataframe(df.head())
+    ingest_key, ingest_stats = st.session_state.get("ingest_stats", (None, None))
+    if ingest_key == key:
+        st.caption(f"Parsed {ingest_stats}")
+    st.dataframe(preview)
 
     query = st.text_input("Ask a question about the data")
 
@@ -103,7 +202,25 @@ if uploaded_file:
             st.markdown(f"**Selected Tool:** `{tool_name}`")
             print(f"Debug: Tool name returned by router: '{tool_name}'")
 
-            if tool_name.lower() in TOOL_FUNCTIONS:
-                TOOL_FUNCTIONS[tool_name.lower()](df, query)
+            tool_name = tool_name.lower()
+            if tool_name in TOOL_FUNCTIONS:
+                profile = load_profile(key, uploaded_file)
+                columns = None
+                if tool_name in COLUMN_RESOLVERS:
+                    columns = COLUMN_RESOLVERS[tool_name](query, profile)
+                df = load_frame(uploaded_file, key, columns)
+
+                # Updating the progress line while a worker computes gives Streamlit a
+                # chance to stop this run when the question changes; the task is then cancelled
+                run_compute = None
+                if get_executor() is not None:
+                    progress = st.empty()
+                    def checkpoint(elapsed):
+                        if elapsed >= 1:
+                            progress.caption(f"Computing... {elapsed:.0f}s")
+                    run_compute = partial(get_executor().run, checkpoint=checkpoint)
+                TOOL_FUNCTIONS[tool_name](df, query, profile, memo=get_result_memo(), dataset_key=key, executor=run_compute)
+                if run_compute is not None:
+                    progress.empty()
             else:
                 st.error("Tool not recognized.")
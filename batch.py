@@ -0,0 +1,84 @@
+"""Headless batch analysis: route and run many questions against one dataset.
+
+    from batch import analyze_batch
+    items = analyze_batch(df, ["average pm2_5 by city", "distribution of aqi", ...])
+
+Each returned BatchItem carries the routed tool, the resolved parameters,
+the tool's result object and, optionally, the rendered figure as PNG (or
+SVG) bytes.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import pandas as pd
+
+from router import route_queries
+from tools import TOOL_STAGES, ToolError, build_profile, figure_bytes, first_option
+from tools.groupby import GroupCube
+from tools.memo import freeze
+
+
+@dataclass
+class BatchItem:
+    query: str
+    tool: str
+    params: dict = None
+    result: object = None
+    figure: bytes = None  # PNG or SVG
+    error: str = None
+
+
+def analyze_batch(df: pd.DataFrame, queries: list, profile=None, max_workers: int = None, render: bool = True,
+                  image_format: str = "png"):
+    """Route all queries together, run the distinct computations in parallel and return BatchItems.
+
+    Identical (tool, parameters) pairs are computed once, and bar charts over
+    the same group and value columns share a single groupby.
+    """
+    profile = profile or build_profile(df)
+    max_workers = max_workers or min(8, os.cpu_count() or 1)
+
+    items = [BatchItem(query, tool) for query, tool in zip(queries, route_queries(queries))]
+    for item in items:
+        resolve = TOOL_STAGES[item.tool][0]
+        try:
+            item.params = resolve(item.query, profile, first_option)
+        except ToolError as e:
+            item.error = str(e)
+
+    tasks = {}
+    for item in items:
+        if item.error is None:
+            tasks.setdefault((item.tool, freeze(item.params)), (item.tool, item.params))
+
+    # Bar charts grouped by the same column share one GroupCube, and each
+    # value column is aggregated once for every method asked about it
+    cubes = {params["group_col"]: None for tool, params in tasks.values() if tool == "bar"}
+
+    def run(tool, params):
+        compute = TOOL_STAGES[tool][1]
+        if tool == "bar":
+            params = dict(params, cube=cubes[params["group_col"]])
+        try:
+            return compute(df, **params), None
+        except ToolError as e:
+            return None, str(e)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        cubes = dict(zip(cubes, pool.map(lambda group_col: GroupCube(df[group_col]), cubes)))
+        outcomes = dict(zip(tasks, pool.map(lambda task: run(*task), tasks.values())))
+
+    # Matplotlib isn't thread-safe, so figures are drawn here one at a time
+    figures = {}
+    for item in items:
+        if item.error is not None:
+            continue
+        key = (item.tool, freeze(item.params))
+        item.result, item.error = outcomes[key]
+        draw = TOOL_STAGES[item.tool][2]
+        if render and draw is not None and item.result is not None:
+            if key not in figures:
+                figures[key] = figure_bytes(draw(item.result), image_format)
+            item.figure = figures[key]
+    return items
@@ -0,0 +1,79 @@
+"""Soak benchmark: render charts repeatedly and watch the process's memory.
+
+    python bench_figures.py [--renders 10000] [--rows 5000] [--every 1000]
+
+Cycles through every tool's compute and draw stages on a synthetic frame,
+rendering each figure to PNG bytes the way the app does, and prints the
+resident set size at regular intervals. With figures closed deterministically,
+RSS should level off after the first few hundred renders instead of growing.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from ingest import peak_rss_mb
+from tools import TOOL_STAGES, build_profile, figure_bytes, first_option
+
+QUERIES = {
+    "bar": "average value by city",
+    "histogram": "distribution of value",
+    "line": "monthly value trend",
+    "scatter": "value vs other",
+    "correlation": "correlation matrix",
+    "pie": "pie of city",
+}
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (peak RSS where /proc isn't available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return peak_rss_mb()
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def synthetic_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "date": pd.date_range("2020-01-01", periods=rows, freq="h"),
+        "city": pd.Categorical(rng.choice(["Delhi", "Mumbai", "Chennai", "Kolkata", "Pune"], rows)),
+        "value": rng.gamma(2.0, 10.0, rows),
+        "other": rng.normal(50, 15, rows),
+        "extra": rng.uniform(0, 1, rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=10_000)
+    parser.add_argument("--rows", type=int, default=5_000)
+    parser.add_argument("--every", type=int, default=1_000)
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows)
+    profile = build_profile(df)
+    tasks = []
+    for tool, query in QUERIES.items():
+        resolve, compute, draw = TOOL_STAGES[tool]
+        tasks.append((tool, draw, compute(df, **resolve(query, profile, first_option))))
+
+    start = time.perf_counter()
+    baseline = None
+    print(f"{'renders':>8} {'rss_mb':>8} {'growth_mb':>10} {'ms/render':>10}")
+    for i in range(1, args.renders + 1):
+        _, draw, result = tasks[i % len(tasks)]
+        figure_bytes(draw(result))
+        if i % args.every == 0 or i == args.renders:
+            rss = rss_mb()
+            baseline = rss if baseline is None else baseline
+            elapsed_ms = (time.perf_counter() - start) * 1000 / i
+            print(f"{i:>8} {rss:>8.1f} {rss - baseline:>10.1f} {elapsed_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
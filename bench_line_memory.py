@@ -0,0 +1,86 @@
+"""Memory benchmark: allocations made by line-chart queries on a large frame.
+
+    python bench_line_memory.py [--rows 10000000]
+
+Builds a synthetic frame and, for a series of line queries, reports the
+peak memory allocated while answering each one (measured with tracemalloc,
+which numpy and pandas buffers report to) next to the size of the frame.
+Queries run once without rollups, as a one-off call would, and then against
+cached rollups, as the app serves them. The frame is checked afterwards to
+confirm no query modified it.
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from tools.line import compute_line, line_rollups
+
+QUERIES = [
+    # (y_col, agg_level, group_col, group_value)
+    ("value", "D", None, None),
+    ("value", "M", None, None),
+    ("value", "M", "city", "Delhi"),
+    ("value", "Y", "city", "Pune"),
+]
+
+
+def synthetic_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    value = rng.gamma(2.0, 10.0, rows).astype(np.float32)
+    value[rng.random(rows) < 0.01] = np.nan
+    return pd.DataFrame({
+        "date": pd.date_range("2000-01-01", periods=rows, freq="min"),
+        "city": pd.Categorical(rng.choice(["Delhi", "Mumbai", "Chennai", "Kolkata", "Pune"], rows)),
+        "value": value,
+    })
+
+
+def measure(fn):
+    """(result, peak MB allocated during the call, seconds)."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, (peak - base) / 1024 / 1024, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows)
+    frame_mb = df.memory_usage(deep=True).sum() / 1024 / 1024
+    before = pd.util.hash_pandas_object(df, index=True).sum()
+    print(f"frame: {len(df):,} rows, {frame_mb:.1f} MB")
+    print(f"{'query':<28} {'path':<10} {'peak_mb':>8} {'x frame':>8} {'ms':>8}")
+
+    def report(label, path, peak, elapsed):
+        print(f"{label:<28} {path:<10} {peak:>8.1f} {peak / frame_mb:>8.2f} {elapsed * 1000:>8.1f}")
+
+    rollups = {}
+    for y_col, level, group_col, group_value in QUERIES:
+        label = f"{y_col} {level}" + (f" {group_col}={group_value}" if group_col else "")
+        _, peak, elapsed = measure(lambda: compute_line(df, y_col, "date", level, group_col, group_value))
+        report(label, "one-off", peak, elapsed)
+
+        if group_col not in rollups:
+            rollups[group_col], peak, elapsed = measure(lambda: line_rollups(df, y_col, "date", group_col))
+            report(f"  build rollups by {group_col}", "build", peak, elapsed)
+        _, peak, elapsed = measure(lambda: compute_line(df, y_col, "date", level, group_col, group_value,
+                                                        rollups=rollups[group_col]))
+        report(label, "cached", peak, elapsed)
+
+    after = pd.util.hash_pandas_object(df, index=True).sum()
+    print("frame unchanged" if before == after else "FRAME WAS MODIFIED")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import threading
+import weakref
+
+import pandas as pd
+
+from lru import LRUCache
+
+# Memory budget for parsed DataFrames kept across reruns (in megabytes)
+DEFAULT_BUDGET_MB = int(os.getenv("CSV_EXPLORER_CACHE_MB", "1024"))
+
+
+def content_hash(data: bytes) -> str:
+    """Return a stable key for the raw bytes of an uploaded file."""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """Approximate in-memory size of a DataFrame, including object payloads."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def read_only_view(df: pd.DataFrame) -> pd.DataFrame:
+    """A frame sharing `df`'s data whose changes never reach `df`.
+
+    Adding or replacing columns only affects the view; with pandas'
+    copy-on-write mode on (as the app sets it), in-place edits of values copy
+    the touched column first as well.
+    """
+    return df.copy(deep=False)
+
+
+class DatasetCache(LRUCache):
+    """LRU cache of parsed DataFrames keyed by content hash, bounded by memory.
+
+    One instance is shared by every session in the process, so a file
+    uploaded by several users is held once. Sessions take a lease(): a
+    read-only view that pins the frame while referenced. Only frames no
+    session holds are evicted to make room, least recently used first.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_BUDGET_MB * 1024 * 1024):
+        super().__init__(max_bytes=max_bytes)
+        self._leases = {}  # key -> number of live views
+        # Reentrant: a lease's finalizer may run during garbage collection inside a locked section
+        self._lock = threading.RLock()
+
+    def sizeof(self, df: pd.DataFrame) -> int:
+        return frame_nbytes(df)
+
+    def evictable(self, key) -> bool:
+        return key not in self._leases
+
+    def lease(self, key: str):
+        """Return a read-only view of the cached frame for `key`, or None.
+
+        The frame stays cached (exempt from eviction) until every view leased
+        for it has been garbage collected.
+        """
+        with self._lock:
+            df = self._lookup(key)
+            if df is None:
+                return None
+            self._leases[key] = self._leases.get(key, 0) + 1
+        view = read_only_view(df)
+        weakref.finalize(view, self._release, key)
+        return view
+
+    def _release(self, key: str):
+        with self._lock:
+            remaining = self._leases.pop(key, 1) - 1
+            if remaining:
+                self._leases[key] = remaining
+            else:
+                # A frame put while others were pinned may have left the cache over budget
+                self._evict()
+
+    def stats(self) -> dict:
+        """Hit/miss counters, current memory usage and the number of leased frames."""
+        with self._lock:
+            return {**super().stats(), "leased": len(self._leases)}
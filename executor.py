@@ -0,0 +1,186 @@
+"""Run tool compute stages in worker processes.
+
+    executor = ProcessExecutor(open_store(), max_workers=4, timeout=120)
+    result = executor.run("correlation", df, params, compute_correlation, dataset_key)
+
+Workers read datasets from the memory-mapped Arrow files of the DatasetStore,
+so a task ships only the tool name, dataset key, parameters and column list;
+the frame itself is never pickled. Results, which are small, come back by
+pipe. A task that runs past its timeout, or whose caller is interrupted (the
+checkpoint callback raises, as Streamlit does when the question changes),
+has its worker terminated and replaced.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+from tools.base import ToolError
+
+# Worker processes; 0 runs every computation in the calling thread
+DEFAULT_WORKERS = int(os.getenv("CSV_EXPLORER_WORKERS", str(os.cpu_count() or 1)))
+# Seconds a single computation may run before it is cancelled
+DEFAULT_TIMEOUT = float(os.getenv("CSV_EXPLORER_TASK_TIMEOUT", "120"))
+# How often a waiting caller checks for cancellation and reports progress
+POLL_SECONDS = 0.25
+# Frames (per dataset and column set) each worker keeps mapped between tasks
+WORKER_FRAMES = 4
+
+
+def _worker_main(conn, store_root: str):
+    """Serve (tool, dataset key, params, columns) tasks from `conn` until it closes."""
+    from store import DatasetStore
+    from tools import CACHED_COMPUTE, TOOL_STAGES
+    from tools.rollups import RollupCache
+
+    store = DatasetStore(store_root)
+    rollups = RollupCache()  # this worker's own rollups and group cubes
+    frames = OrderedDict()
+    while True:
+        try:
+            tool, dataset_key, params, columns = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            frame_key = (dataset_key, None if columns is None else tuple(columns))
+            df = frames.get(frame_key)
+            if df is None:
+                df = frames[frame_key] = store.read(dataset_key, columns)
+                while len(frames) > WORKER_FRAMES:
+                    frames.popitem(last=False)
+            frames.move_to_end(frame_key)
+
+            factory = CACHED_COMPUTE.get(tool)
+            compute = factory(rollups, dataset_key) if factory else TOOL_STAGES[tool][1]
+            conn.send(("ok", compute(df, **params)))
+        except ToolError as e:
+            conn.send(("tool_error", (str(e), e.level)))
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+
+
+class _Worker:
+    def __init__(self, context, store_root: str):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, store_root), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class ProcessExecutor:
+    """Pool of worker processes running compute stages over stored datasets.
+
+    Workers are started on first use (with "spawn", which is safe alongside
+    the server's threads) and reused; at most `max_workers` tasks run at once
+    and further callers wait for a free worker. `run` falls back to computing
+    in the caller when the dataset isn't in the store.
+    """
+
+    def __init__(self, store, max_workers: int = DEFAULT_WORKERS, timeout: float = DEFAULT_TIMEOUT):
+        self.store = store
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.LifoQueue()
+        self._started = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self, checkpoint=None) -> _Worker:
+        """An idle worker, a newly started one if below max_workers, or the next to come free."""
+        waited = 0.0
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                start = self._started < self.max_workers
+                if start:
+                    self._started += 1
+            if start:
+                try:
+                    return _Worker(self._context, self.store.root)
+                except Exception:
+                    with self._lock:
+                        self._started -= 1
+                    raise
+            try:
+                return self._idle.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                # Workers discarded meanwhile free their slots, so look again
+                waited += POLL_SECONDS
+                if checkpoint is not None:
+                    checkpoint(waited)
+
+    def _discard(self, worker: _Worker):
+        worker.stop()
+        with self._lock:
+            self._started -= 1
+
+    def run(self, tool: str, df, params: dict, compute, dataset_key: str = None, checkpoint=None):
+        """Result of `compute(df, **params)`, computed in a worker from the stored copy of the dataset.
+
+        `checkpoint(elapsed_seconds)` is called while waiting; if it raises,
+        the task is cancelled and the exception propagates. Raises ToolError
+        when the task times out, its worker dies, or compute raises in the worker.
+        """
+        if not dataset_key or dataset_key not in self.store:
+            return compute(df, **params)
+
+        worker = self._acquire(checkpoint)
+        done = False
+        try:
+            worker.conn.send((tool, dataset_key, params, list(df.columns)))
+            start = time.monotonic()
+            while not worker.conn.poll(POLL_SECONDS):
+                elapsed = time.monotonic() - start
+                if not worker.process.is_alive():
+                    raise ToolError(f"The {tool} computation stopped unexpectedly.")
+                if self.timeout and elapsed > self.timeout:
+                    raise ToolError(f"The {tool} computation took longer than {self.timeout:g}s and was cancelled.",
+                                    level="warning")
+                if checkpoint is not None:
+                    checkpoint(elapsed)
+            status, payload = worker.conn.recv()
+            done = True
+        except (OSError, EOFError):
+            # The worker died before taking the task (a broken pipe) or while answering it
+            raise ToolError(f"The {tool} computation stopped unexpectedly.")
+        finally:
+            if done:
+                self._idle.put(worker)
+            else:
+                self._discard(worker)  # cancelled, timed out or crashed: its task can't be taken back
+
+        if status == "tool_error":
+            message, level = payload
+            raise ToolError(message, level=level)
+        if status == "error":
+            # The traceback goes to the server log; the user gets the exception line
+            print(f"Debug: {tool} failed in a worker process:\n{payload}")
+            raise ToolError(f"The {tool} computation failed: {payload.strip().splitlines()[-1]}")
+        return payload
+
+    def shutdown(self):
+        """Stop the idle workers (busy ones are stopped when their task ends or is cancelled)."""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(worker)
+
+
+def open_executor(store, max_workers: int = DEFAULT_WORKERS, timeout: float = DEFAULT_TIMEOUT):
+    """Return a ProcessExecutor, or None when there is no store to share datasets through or workers are off."""
+    if store is None or max_workers <= 0:
+        return None
+    return ProcessExecutor(store, max_workers, timeout)
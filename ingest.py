@@ -0,0 +1,229 @@
+import io
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Rows read per chunk and rows used for dtype inference
+CHUNK_ROWS = 200_000
+SAMPLE_ROWS = 20_000
+
+# A text column becomes categorical when it repeats enough in the sample
+CATEGORY_MAX_UNIQUE = 10_000
+CATEGORY_MAX_RATIO = 0.5
+
+# Fraction of non-null sample values that must parse for a column to be a date
+DATE_MIN_PARSED = 0.95
+DATE_FORMATS = [
+    "%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%Y/%m/%d", "%d.%m.%Y",
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%d-%m-%Y %H:%M", "%d/%m/%Y %H:%M",
+]
+
+# Floats are stored as float32 only when every value has at most this many
+# significant digits (float32's FLT_DIG), so each still reads back as written
+FLOAT32_DIGITS = 6
+# Whole numbers at or above this aren't all representable in float32 (e.g. IDs)
+FLOAT32_MAX_INTEGER = 2 ** 24
+
+
+@dataclass
+class IngestStats:
+    """Throughput and memory figures for one CSV load."""
+    rows: int
+    seconds: float
+    peak_rss_mb: float
+    dtypes: dict = field(default_factory=dict)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self):
+        return (f"{self.rows:,} rows in {self.seconds:.2f}s "
+                f"({self.rows_per_sec:,.0f} rows/s, peak RSS {self.peak_rss_mb:,.0f} MB)")
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in megabytes."""
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def detect_datetime_format(values: pd.Series):
+    """Return the first known format that parses nearly all non-null values, or None."""
+    values = values.dropna().astype(str)
+    if values.empty:
+        return None
+    for fmt in DATE_FORMATS:
+        parsed = pd.to_datetime(values, format=fmt, errors="coerce")
+        if parsed.notna().mean() >= DATE_MIN_PARSED:
+            return fmt
+    return None
+
+
+def _fits_float32(values: pd.Series) -> bool:
+    """True if storing `values` as float32 keeps every value distinct and printing as written."""
+    values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    values = values[np.isfinite(values) & (values != 0)]
+    if values.size == 0:
+        return True
+    magnitude = np.abs(values)
+    if magnitude.max() > np.finfo(np.float32).max or magnitude.min() < np.finfo(np.float32).tiny:
+        return False
+    if (magnitude[values == np.round(values)] >= FLOAT32_MAX_INTEGER).any():
+        return False
+    # Scale each value so its FLOAT32_DIGITS significant digits sit left of the point;
+    # any further digit shows up as a fractional part
+    scaled = values * 10.0 ** (FLOAT32_DIGITS - 1 - np.floor(np.log10(magnitude)))
+    return bool((np.abs(scaled - np.round(scaled)) < 1e-6).all())
+
+
+def infer_plan(sample: pd.DataFrame) -> dict:
+    """Decide a compact storage kind for each column from a sample.
+
+    Returns a mapping of column -> (kind, arg) where kind is one of
+    "category", "datetime" (arg is the format), "float32", "float",
+    "integer" or "keep".
+    """
+    plan = {}
+    for col in sample.columns:
+        series = sample[col]
+        if pd.api.types.is_integer_dtype(series):
+            plan[col] = ("integer", None)
+        elif pd.api.types.is_float_dtype(series):
+            plan[col] = ("float32", None) if _fits_float32(series) else ("float", None)
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            fmt = detect_datetime_format(series)
+            nunique = series.nunique()
+            if fmt is not None:
+                plan[col] = ("datetime", fmt)
+            elif nunique <= CATEGORY_MAX_UNIQUE and nunique <= CATEGORY_MAX_RATIO * max(len(series), 1):
+                plan[col] = ("category", None)
+            else:
+                plan[col] = ("keep", None)
+        else:
+            plan[col] = ("keep", None)
+    return plan
+
+
+class _PlanMismatch(Exception):
+    """A chunk past the sample doesn't fit the kind planned for `column`; `kind` is the fallback."""
+
+    def __init__(self, column: str, kind: tuple):
+        super().__init__(column)
+        self.column = column
+        self.kind = kind
+
+
+def _read_dtypes(plan: dict) -> dict:
+    """dtype argument for read_csv; numbers are downcast per chunk instead, so a value the sample
+    didn't anticipate can't fail the read."""
+    dtypes = {}
+    for col, (kind, _) in plan.items():
+        if kind == "category":
+            dtypes[col] = "category"
+        elif kind == "datetime":
+            dtypes[col] = "object"
+    return dtypes
+
+
+def _compact_chunk(chunk: pd.DataFrame, plan: dict) -> pd.DataFrame:
+    """Convert a chunk to the planned kinds; raises _PlanMismatch when its values don't allow it."""
+    for col, (kind, arg) in plan.items():
+        if col not in chunk:
+            continue
+        if kind == "datetime":
+            parsed = pd.to_datetime(chunk[col], format=arg, errors="coerce")
+            if (parsed.isna() & chunk[col].notna()).any():
+                raise _PlanMismatch(col, ("keep", None))
+            chunk[col] = parsed
+        elif kind in ("integer", "float32", "float"):
+            if not pd.api.types.is_numeric_dtype(chunk[col]):
+                raise _PlanMismatch(col, ("keep", None))
+            if kind == "integer" and pd.api.types.is_integer_dtype(chunk[col]):
+                chunk[col] = pd.to_numeric(chunk[col], downcast="integer")
+            elif kind == "float32":
+                if not _fits_float32(chunk[col]):
+                    raise _PlanMismatch(col, ("float", None))
+                chunk[col] = chunk[col].astype(np.float32)
+    return chunk
+
+
+def _combine(chunks: list) -> pd.DataFrame:
+    """Concatenate chunks column by column, merging per-chunk categories."""
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[col] = pd.Series(union_categoricals(parts), name=col)
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+        for chunk in chunks:
+            del chunk[col]
+    return pd.DataFrame(columns)
+
+
+def _reopener(source):
+    """A function returning something read_csv can read `source` from, afresh on each call.
+
+    pandas closes a file object when a read stops part way, so a file object
+    is read once and every pass gets its own buffer over those bytes (which
+    BytesIO shares rather than copies).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return lambda: source
+    data = source.getvalue() if hasattr(source, "getvalue") else source.read()
+    if isinstance(data, str):
+        return lambda: io.StringIO(data)
+    return lambda: io.BytesIO(data)
+
+
+def read_csv_chunked(source, chunk_rows: int = CHUNK_ROWS, sample_rows: int = SAMPLE_ROWS):
+    """Load a CSV in chunks using compact dtypes inferred from a leading sample.
+
+    `source` is a path or a file object such as a Streamlit upload.
+    Returns the DataFrame and an IngestStats record.
+    """
+    start = time.perf_counter()
+    reopen = _reopener(source)
+
+    sample = pd.read_csv(reopen(), nrows=sample_rows)
+    plan = infer_plan(sample)
+    del sample
+
+    while True:
+        chunks = []
+        try:
+            with pd.read_csv(reopen(), chunksize=chunk_rows, dtype=_read_dtypes(plan)) as reader:
+                for chunk in reader:
+                    chunks.append(_compact_chunk(chunk, plan))
+            break
+        except _PlanMismatch as e:
+            # A value after the sample (text in a numeric column, a date in another
+            # format, a float that float32 would change) rules the plan out for
+            # that column: widen it and read again rather than lose the value
+            plan[e.column] = e.kind
+
+    df = _combine(chunks) if chunks else pd.DataFrame(columns=list(plan))
+
+    stats = IngestStats(
+        rows=len(df),
+        seconds=time.perf_counter() - start,
+        peak_rss_mb=peak_rss_mb(),
+        dtypes={col: str(dtype) for col, dtype in df.dtypes.items()},
+    )
+    return df, stats
@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with hit/miss counters, bounded by entry count and/or total size.
+
+    Subclasses measure entries by overriding `sizeof` (sizes only count
+    toward `max_bytes`), and can pin entries by overriding `evictable`.
+    Their own methods call the underscored helpers with `_lock` held.
+    """
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def sizeof(self, value) -> int:
+        return 0
+
+    def evictable(self, key) -> bool:
+        return True
+
+    def get(self, key):
+        """Return the cached value for `key` or None, updating recency and counters."""
+        with self._lock:
+            return self._lookup(key)
+
+    def put(self, key, value):
+        """Store a value, evicting least recently used entries to stay within the bounds."""
+        size = self.sizeof(value)
+        with self._lock:
+            self._store(key, value, size)
+        return value
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def _store(self, key, value, size: int = 0):
+        self._discard(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Larger than the whole budget: hand it back without retaining it
+            return
+        self._evict(reserve_entries=1, reserve_bytes=size)
+        self._entries[key] = (value, size)
+        self._bytes += size
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _evict(self, reserve_entries: int = 0, reserve_bytes: int = 0):
+        """Drop evictable entries, least recently used first, until the reserved room is free."""
+        max_entries = None if self.max_entries is None else self.max_entries - reserve_entries
+        max_bytes = None if self.max_bytes is None else self.max_bytes - reserve_bytes
+        for key in list(self._entries):
+            over_entries = max_entries is not None and len(self._entries) > max_entries
+            over_bytes = max_bytes is not None and self._bytes > max_bytes
+            if not (over_entries or over_bytes):
+                return
+            if self.evictable(key):
+                self._discard(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+            if self.max_bytes is not None:
+                stats.update(bytes=self._bytes, max_bytes=self.max_bytes)
+            return stats
@@ -0,0 +1,82 @@
+import json
+import math
+import re
+import zlib
+
+# Number of hashed feature buckets
+N_BUCKETS = 1 << 18
+
+WORDS = re.compile(r"[a-z0-9]+")
+
+
+def _bucket(feature: str) -> int:
+    # crc32 rather than hash(): Python's string hash is salted per process
+    return zlib.crc32(feature.encode("utf-8")) % N_BUCKETS
+
+
+def featurize(query: str):
+    """Hashed word uni/bigrams and character 3-5 grams of a query, as a list of buckets."""
+    words = WORDS.findall(query.lower())
+    features = [f"w:{w}" for w in words]
+    features += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+    text = f" {' '.join(words)} "
+    for n in (3, 4, 5):
+        features += [f"c:{text[i:i + n]}" for i in range(len(text) - n + 1)]
+    return sorted({_bucket(feature) for feature in features})
+
+
+class QueryClassifier:
+    """Linear (softmax) classifier over hashed n-grams mapping a query to a tool.
+
+    Only buckets with non-zero weights are kept, so prediction is a handful of
+    dictionary lookups and additions: well under a millisecond per query.
+    """
+
+    def __init__(self, classes: list, bias: list, weights: dict):
+        self.classes = classes
+        self.bias = bias
+        self.weights = weights  # bucket -> per-class weights
+
+    def predict_proba(self, query: str) -> dict:
+        scores = list(self.bias)
+        for bucket in featurize(query):
+            row = self.weights.get(bucket)
+            if row is not None:
+                for i, w in enumerate(row):
+                    scores[i] += w
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        total = sum(exps)
+        return {cls: e / total for cls, e in zip(self.classes, exps)}
+
+    def predict(self, query: str):
+        """Return (tool, confidence) for the query."""
+        proba = self.predict_proba(query)
+        tool = max(proba, key=proba.get)
+        return tool, proba[tool]
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({
+                "n_buckets": N_BUCKETS,
+                "classes": self.classes,
+                "bias": [round(b, 5) for b in self.bias],
+                "weights": {str(k): [round(w, 5) for w in row] for k, row in self.weights.items()},
+            }, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path) as f:
+            data = json.load(f)
+        if data["n_buckets"] != N_BUCKETS:
+            raise ValueError(f"Model was trained with {data['n_buckets']} buckets, expected {N_BUCKETS}")
+        return cls(data["classes"], data["bias"], {int(k): row for k, row in data["weights"].items()})
+
+
+def load_classifier(path: str):
+    """Load a saved classifier, or return None if the file is missing or unreadable."""
+    try:
+        return QueryClassifier.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Debug: Query classifier not loaded from '{path}': {e}")
+        return None
@@ -0,0 +1,61 @@
+import re
+import sqlite3
+import time
+
+from lru import LRUCache
+
+PUNCTUATION = re.compile(r"[^\w\s]")
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: lowercased, punctuation stripped, whitespace collapsed."""
+    query = PUNCTUATION.sub(" ", query.lower())
+    return WHITESPACE.sub(" ", query).strip()
+
+
+class RouteCache(LRUCache):
+    """LRU + TTL cache of routing decisions, optionally persisted to SQLite.
+
+    The in-memory LRU answers repeated questions within a process; the
+    SQLite file (when `db_path` is given) lets decisions survive restarts.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl: float = 7 * 24 * 3600, db_path: str = None):
+        super().__init__(max_entries=max_entries)
+        self.ttl = ttl
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS routes (query TEXT PRIMARY KEY, tool TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def _fresh(self, stored_at: float) -> bool:
+        return time.time() - stored_at < self.ttl
+
+    def get(self, query: str):
+        """Return the cached tool for `query`, or None if missing or expired."""
+        key = normalize_query(query)
+        with self._lock:
+            if key not in self._entries and self._db is not None:
+                row = self._db.execute("SELECT tool, stored_at FROM routes WHERE query = ?", (key,)).fetchone()
+                if row is not None:
+                    self._store(key, (row[0], row[1]))
+            entry = self._entries.get(key)
+            if entry is not None and not self._fresh(entry[0][1]):
+                self._discard(key)
+            entry = self._lookup(key)
+            return None if entry is None else entry[0]
+
+    def put(self, query: str, tool: str):
+        key = normalize_query(query)
+        entry = (tool, time.time())
+        with self._lock:
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO routes (query, tool, stored_at) VALUES (?, ?, ?)", (key, *entry)
+                )
+                self._db.commit()
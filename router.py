@@ -1,5 +1,10 @@
 import requests
 import os
+import re
+from requests.adapters import HTTPAdapter
+
+from query_classifier import load_classifier
+from route_cache import RouteCache
 
 TOOLS = ["summary", "scatter", "line", "bar", "histogram", "correlation", "pie"]
 
@@ -16,43 +21,96 @@ KEYWORD_MAP = {
 # Priority order for plot selection
 PLOT_PRIORITY = ["summary", "line", "bar", "scatter", "histogram", "pie", "correlation"]
 
+# === Compiled keyword matcher ===
+# Every tool name and keyword goes into one lookahead alternation, so a single
+# scan reports every occurrence (overlapping ones included) with its position.
+# Alternatives are tried longest first; a shorter pattern starting at the same
+# position is always a prefix of the longer one, so each pattern carries the
+# tools of all its prefixes as well.
+_PATTERN_TOOLS = {}
+for _tool in TOOLS:
+    _PATTERN_TOOLS.setdefault(_tool.lower(), set()).add(("explicit", _tool))
+for _tool, _keywords in KEYWORD_MAP.items():
+    for _keyword in _keywords:
+        _PATTERN_TOOLS.setdefault(_keyword, set()).add(("keyword", _tool))
+_PATTERN_CLOSURE = {
+    pattern: {entry for prefix, entries in _PATTERN_TOOLS.items() if pattern.startswith(prefix) for entry in entries}
+    for pattern in _PATTERN_TOOLS
+}
+_MATCHER = re.compile(
+    "(?=(" + "|".join(re.escape(p) for p in sorted(_PATTERN_TOOLS, key=len, reverse=True)) + "))"
+)
+_TOOL_ORDER = {tool: i for i, tool in enumerate(TOOLS)}
+_PRIORITY_ORDER = {tool: i for i, tool in enumerate(PLOT_PRIORITY)}
+
+
+def match_tools(query_lower: str):
+    """All (kind, tool, position) hits in a lowercased query, from one regex scan.
+
+    `kind` is "explicit" when the tool is named outright and "keyword" when
+    one of its KEYWORD_MAP entries appears.
+    """
+    hits = []
+    for match in _MATCHER.finditer(query_lower):
+        for kind, tool in _PATTERN_CLOSURE[match.group(1)]:
+            hits.append((kind, tool, match.start()))
+    return hits
+
+
+def match_tool(query_lower: str):
+    """The keyword-routed tool for a lowercased query, or None.
+
+    Explicit tool names win (in TOOLS order), then keywords in PLOT_PRIORITY order.
+    """
+    explicit, keyword = set(), set()
+    for kind, tool, _ in match_tools(query_lower):
+        (explicit if kind == "explicit" else keyword).add(tool)
+    if explicit:
+        return min(explicit, key=_TOOL_ORDER.get)
+    if keyword:
+        return min(keyword, key=_PRIORITY_ORDER.get)
+    return None
+
+
 # Use an environment variable to store the API key
 API_KEY = os.getenv("GEMMA_API_KEY")
 
 # Ensure to instruct the user to set the environment variable in their system or deployment environment
 
-OPENAI_URL = "https://litellm.dev.ai-cloud.me/v1/chat/completions"
+OPENAI_URL = os.getenv("ROUTER_LLM_URL", "https://litellm.dev.ai-cloud.me/v1/chat/completions")
 
-def route_query_to_tool(query: str) -> str:
-    """Route a query to the appropriate tool based on keywords and context."""
-    if not query:
-        return "summary"  # Default to summary if no query
-        
-    query_lower = query.lower()
-    print(f"Debug: Processing query: '{query_lower}'")
-    
-    # First check for explicit tool mentions
-    for tool in TOOLS:
-        if tool.lower() in query_lower:
-            print(f"Debug: Found explicit tool mention: {tool}")
-            return tool
-    
-    # Then check keyword matches in priority order
-    for tool in PLOT_PRIORITY:
-        keywords = KEYWORD_MAP[tool]
-        if any(keyword in query_lower for keyword in keywords):
-            print(f"Debug: Found match for tool: {tool}")
-            return tool
-    
-    # If no matches found, use LLM for more nuanced understanding
-    keyword_hint = "\n".join([f"- {tool}: {', '.join(words)}" for tool, words in KEYWORD_MAP.items()])
-    
-    prompt = f"""
+# Seconds to wait for the LLM before falling back to the default tool
+LLM_TIMEOUT = float(os.getenv("ROUTER_LLM_TIMEOUT", "10"))
+
+# Keep-alive session so repeated fallbacks reuse one pooled connection
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# LLM routing decisions by normalized query; set ROUTER_CACHE_DB to persist them across restarts
+route_cache = RouteCache(
+    max_entries=int(os.getenv("ROUTER_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("ROUTER_CACHE_TTL", str(7 * 24 * 3600))),
+    db_path=os.getenv("ROUTER_CACHE_DB"),
+)
+
+# Local classifier tier between keyword matching and the LLM; its answer is
+# used only when it is at least this confident (see train_router.py)
+CLASSIFIER_THRESHOLD = float(os.getenv("ROUTER_CLASSIFIER_THRESHOLD", "0.6"))
+CLASSIFIER_PATH = os.getenv(
+    "ROUTER_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "router_model.json")
+)
+classifier = load_classifier(CLASSIFIER_PATH)
+
+# Prompt for the LLM fallback, built once; only the query is filled in per call
+KEYWORD_HINT = "\n".join([f"- {tool}: {', '.join(words)}" for tool, words in KEYWORD_MAP.items()])
+
+PROMPT_TEMPLATE = f"""
 You are a tool router for a CSV analyst bot. Select exactly one tool from this list:
 {TOOLS}
 
 Here's when to use each tool:
-{keyword_hint}
+{KEYWORD_HINT}
 
 Consider these priorities:
 1. Summary for general dataset information and statistics
@@ -63,31 +121,118 @@ Consider these priorities:
 6. Pie charts for proportions
 7. Correlation matrix for multiple variable relationships
 
-User Query: "{query}"
+User Query: "{{query}}"
 
 Respond with ONLY the tool name, nothing else.
 Tool:
 """
+
+BATCH_PROMPT_TEMPLATE = f"""
+You are a tool router for a CSV analyst bot. For each numbered user query below,
+select exactly one tool from this list:
+{TOOLS}
+
+Here's when to use each tool:
+{KEYWORD_HINT}
+
+User Queries:
+{{queries}}
+
+Respond with one line per query in the form "<number>: <tool name>", nothing else.
+"""
+
+BATCH_ANSWER = re.compile(r"^\s*(\d+)\s*[:.)-]\s*([a-z]+)", re.MULTILINE)
+
+def route_locally(query: str):
+    """Route without the LLM: keywords, then cached LLM answers, then the confident classifier.
+
+    Returns None when the query still needs the LLM.
+    """
+    if not query:
+        return "summary"  # Default to summary if no query
+
+    query_lower = query.lower()
+    print(f"Debug: Processing query: '{query_lower}'")
+    
+    # Explicit tool mentions first, then keyword matches in priority order
+    tool = match_tool(query_lower)
+    if tool:
+        print(f"Debug: Found match for tool: {tool}")
+        return tool
+    
+    # Then an earlier LLM answer for the same query, which the classifier must not override
+    cached = route_cache.get(query)
+    if cached is not None:
+        print(f"Debug: Using cached route: {cached}")
+        return cached
+
+    # Then the local classifier, if it is confident enough
+    if classifier is not None:
+        tool, confidence = classifier.predict(query)
+        if confidence >= CLASSIFIER_THRESHOLD:
+            print(f"Debug: Classifier chose {tool} ({confidence:.2f})")
+            return tool
+    return None
+
+def ask_llm(prompt: str) -> str:
+    """Send one prompt to the routing LLM and return its lowercased answer."""
+    headers = {
+        "Authorization": f"Bearer {API_KEY}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "model": "gemma-3-27b",
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.7
+    }
+    response = _session.post(OPENAI_URL, json=payload, headers=headers, timeout=LLM_TIMEOUT)
+    response.raise_for_status()
+    response_data = response.json()
+    return response_data["choices"][0]["message"]["content"].strip().lower()
+
+def route_query_to_tool(query: str) -> str:
+    """Route a query to the appropriate tool based on keywords and context."""
+    tool = route_locally(query)
+    if tool:
+        return tool
+
+    # If no matches found, use LLM for more nuanced understanding
+    prompt = PROMPT_TEMPLATE.format(query=query)
     try:
-        headers = {
-            "Authorization": f"Bearer {API_KEY}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": "gemma-3-27b",
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.7
-        }
-        response = requests.post(OPENAI_URL, json=payload, headers=headers)
-        response_data = response.json()
-        content = response_data["choices"][0]["message"]["content"].strip().lower()
+        content = ask_llm(prompt)
         print(f"Debug: LLM response: '{content}'")
         
         if content in TOOLS:
+            route_cache.put(query, content)
             return content
         else:
             print(f"Debug: Invalid tool name received: '{content}'")
             return "summary"  # Default to summary for unclear queries
-    except:
-        print("Debug: LLM call failed, defaulting to summary")
+    except Exception as e:
+        print(f"Debug: LLM call failed ({e}), defaulting to summary")
         return "summary"  # Default to summary if LLM fails
+
+def route_queries(queries: list) -> list:
+    """Route many queries at once: local tiers per query, then a single LLM request for the rest."""
+    tools = [route_locally(query) for query in queries]
+    pending = {}
+    for query, tool in zip(queries, tools):
+        if tool is None:
+            pending.setdefault(query, len(pending) + 1)
+    if not pending:
+        return tools
+
+    numbered = "\n".join(f"{number}. {query}" for query, number in pending.items())
+    answers = {}
+    try:
+        content = ask_llm(BATCH_PROMPT_TEMPLATE.format(queries=numbered))
+        print(f"Debug: Batch LLM response: '{content}'")
+        answers = {int(number): tool for number, tool in BATCH_ANSWER.findall(content) if tool in TOOLS}
+    except Exception as e:
+        print(f"Debug: Batch LLM call failed ({e}), defaulting to summary")
+
+    for query, number in pending.items():
+        if number in answers:
+            route_cache.put(query, answers[number])
+    # Default to summary for queries the LLM didn't answer clearly
+    return [tool or answers.get(pending[query], "summary") for query, tool in zip(queries, tools)]
@@ -0,0 +1,83 @@
+import os
+import pickle
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional; without it datasets are only cached in memory
+    feather = None
+
+# Directory holding converted datasets, one Arrow IPC (Feather v2) file per content hash
+DEFAULT_STORE_DIR = os.getenv("CSV_EXPLORER_STORE_DIR", ".dataset_store")
+
+
+class DatasetStore:
+    """On-disk columnar copies of uploaded CSVs, keyed by content hash.
+
+    Files are written uncompressed so they can be memory-mapped on reload:
+    reading a dataset (or a subset of its columns) pages the data in from
+    disk instead of parsing text again.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR):
+        if feather is None:
+            raise ImportError("pyarrow is required for the on-disk dataset store")
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.arrow")
+
+    def __contains__(self, key: str):
+        return os.path.exists(self.path(key))
+
+    def put(self, key: str, df: pd.DataFrame):
+        """Write a frame for `key` atomically, so readers never see a partial file."""
+        if key in self:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        try:
+            feather.write_feather(df.reset_index(drop=True), tmp_path, compression="uncompressed")
+            os.replace(tmp_path, self.path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def profile_path(self, key: str, version: int) -> str:
+        return os.path.join(self.root, f"{key}.profile-v{version}.pkl")
+
+    def put_profile(self, key: str, profile, version: int):
+        """Save the dataset profile next to its data so later sessions skip the metadata scan."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(profile, f)
+        os.replace(tmp_path, self.profile_path(key, version))
+
+    def read_profile(self, key: str, version: int):
+        """Return the saved profile for `key`, or None if missing, unreadable or from another version."""
+        try:
+            with open(self.profile_path(key, version), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, AttributeError, ImportError, EOFError):
+            return None
+
+    def _table(self, key: str, columns=None):
+        return feather.read_table(self.path(key), columns=columns, memory_map=True)
+
+    def read(self, key: str, columns=None) -> pd.DataFrame:
+        """Memory-map the stored dataset, loading only `columns` when given."""
+        # split_blocks keeps null-free numeric columns as views of the mapped file
+        return self._table(key, columns).to_pandas(split_blocks=True)
+
+    def head(self, key: str, n: int = 5) -> pd.DataFrame:
+        return self._table(key).slice(0, n).to_pandas()
+
+
+def open_store(root: str = DEFAULT_STORE_DIR):
+    """Return a DatasetStore, or None when pyarrow is not installed."""
+    if feather is None:
+        return None
+    return DatasetStore(root)
@@ -0,0 +1,49 @@
+import random
+import threading
+
+from tools.ahocorasick import AhoCorasick
+from tools.resolver import normalize
+from tools.value_index import ValueIndex
+
+PATTERNS = ["he", "she", "his", "hers", "a", "ab", "bab", "bc", "bca", "c", "caa"]
+
+
+def brute_force(text):
+    return sorted((i, i + len(p), p) for p in PATTERNS for i in range(len(text)) if text.startswith(p, i))
+
+
+def test_find_matches_brute_force():
+    matcher = AhoCorasick((p, p) for p in PATTERNS).build()
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = "".join(rng.choice("abcehirs") for _ in range(30))
+        assert sorted(matcher.find(text)) == brute_force(text)
+
+
+def test_patterns_added_after_build_are_found():
+    matcher = AhoCorasick([("he", 1)]).build()
+    matcher.add("she", 2)
+    assert sorted(matcher.find("ushe")) == [(1, 4, 2), (2, 4, 1)]
+
+
+def test_concurrent_first_finds_agree():
+    text = "ushersabcaab"
+    for _ in range(50):
+        matcher = AhoCorasick((p, p) for p in PATTERNS)  # not built: the first finds race to build it
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(sorted(matcher.find(text)))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [brute_force(text)] * 8
+
+
+def test_value_index_prefers_longest_then_dataset_order():
+    index = ValueIndex({"city": ["Delhi", "New Delhi", "Pune"], "state": ["Delhi"]}, normalize)
+    assert {(hit.column, hit.value) for hit in index.find("aqi in delhi and pune")} == {
+        ("city", "Delhi"), ("state", "Delhi"), ("city", "Pune")}
+    assert index.best_match("aqi in New Delhi")[:2] == ("city", "New Delhi")
+    assert index.best_match("aqi in delhi")[:2] == ("city", "Delhi")
+    assert index.best_match("aqi in delhi", columns={"state"})[:2] == ("state", "Delhi")
+    assert index.best_match("aqi in mumbai") is None
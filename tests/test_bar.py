@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.bar import MAX_GROUPS, OTHER_LABEL, TOP_K, compute_bar, fold_other
+from tools.groupby import AGGREGATIONS
+
+
+@pytest.fixture
+def grouped():
+    rng = np.random.default_rng(3)
+    n = 20_000
+    frame = pd.DataFrame({
+        "group": rng.choice([f"g{i}" for i in range(40)] + [None], n),
+        "value": rng.exponential(5.0, n),
+    })
+    frame.loc[rng.random(n) < 0.1, "value"] = np.nan
+    frame.loc[frame.index[frame["group"] == "g1"][1:], "value"] = np.nan  # a group with one value
+    return frame
+
+
+@pytest.mark.parametrize("agg_method", ["count", "sum", "mean", "min", "max", "std"])
+def test_fold_other_matches_pooled_rows(grouped, agg_method):
+    aggregates = grouped.groupby("group")["value"].agg(AGGREGATIONS)
+    folded = aggregates.index[5:]
+    rows = grouped.loc[grouped["group"].isin(folded), "value"]
+    assert fold_other(aggregates.loc[folded], agg_method) == pytest.approx(rows.agg(agg_method), rel=1e-10)
+
+
+def test_fold_other_has_no_median(grouped):
+    aggregates = grouped.groupby("group")["value"].agg(AGGREGATIONS)
+    assert fold_other(aggregates, "median") is None
+
+
+def test_few_groups_are_all_drawn(grouped):
+    few = grouped[grouped["group"].isin([f"g{i}" for i in range(MAX_GROUPS)])]
+    result = compute_bar(few, "value", "group", "mean")
+    expected = few.groupby("group")["value"].mean().sort_values(ascending=False)
+    assert result.grouped_data["group"].tolist() == expected.index.tolist()
+    assert result.other_groups == 0
+
+
+def test_many_groups_keep_the_top_k_and_fold_the_rest(grouped):
+    result = compute_bar(grouped, "value", "group", "sum")
+    sums = grouped.groupby("group")["value"].sum().sort_values(ascending=False, kind="stable")
+    drawn = result.grouped_data
+    assert drawn["group"].tolist()[:TOP_K] == sums.index[:TOP_K].tolist()
+    assert drawn["group"].iloc[-1] == f"{OTHER_LABEL} (20 groups)"
+    assert drawn["value"].iloc[-1] == pytest.approx(sums.iloc[TOP_K:].sum())
+    assert result.other_groups == 20 and result.stats["groups"] == 40
@@ -0,0 +1,75 @@
+import gc
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import DatasetCache, content_hash, frame_nbytes
+
+
+def frame(rows: int = 1000) -> pd.DataFrame:
+    return pd.DataFrame({"a": np.arange(rows, dtype=np.int64)})
+
+
+def test_content_hash_is_stable():
+    assert content_hash(b"a,b\n1,2\n") == content_hash(b"a,b\n1,2\n")
+    assert content_hash(b"a,b\n1,2\n") != content_hash(b"a,b\n1,3\n")
+
+
+def test_evicts_least_recently_used_within_budget():
+    df = frame()
+    cache = DatasetCache(max_bytes=int(frame_nbytes(df) * 2.5))
+    cache.put("a", df)
+    cache.put("b", df)
+    assert cache.get("a") is df  # "b" is now least recently used
+    cache.put("c", df)
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.stats()["bytes"] == 2 * frame_nbytes(df)
+
+
+def test_frame_over_budget_is_returned_but_not_kept():
+    df = frame()
+    cache = DatasetCache(max_bytes=frame_nbytes(df) - 1)
+    assert cache.put("a", df) is df
+    assert "a" not in cache and cache.get("a") is None
+
+
+def test_counts_hits_and_misses():
+    cache = DatasetCache()
+    cache.put("a", frame())
+    cache.get("a")
+    cache.get("missing")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_leased_frame_is_not_evicted_until_released():
+    df = frame()
+    cache = DatasetCache(max_bytes=int(frame_nbytes(df) * 1.5))
+    cache.put("a", df)
+    view = cache.lease("a")
+    cache.put("b", df)  # over budget, but "a" is pinned
+    assert "a" in cache and "b" in cache
+    assert cache.stats()["leased"] == 1
+
+    del view
+    gc.collect()
+    assert cache.stats()["leased"] == 0
+    assert "a" not in cache and "b" in cache  # released, then evicted to get back within budget
+
+
+def test_lease_of_missing_key_is_none():
+    assert DatasetCache().lease("missing") is None
+
+
+def test_changes_through_a_view_do_not_reach_the_shared_frame():
+    df = pd.DataFrame({"a": [1.0, 2.0, 3.0], "b": ["x", "y", "z"]})
+    cache = DatasetCache()
+    cache.put("k", df)
+    with pd.option_context("mode.copy_on_write", True):
+        view = cache.lease("k")
+        view.loc[0, "a"] = 100.0
+        view["c"] = 1
+        view.drop(columns="b", inplace=True)
+        other = cache.lease("k")
+    assert df["a"].tolist() == [1.0, 2.0, 3.0] and list(df.columns) == ["a", "b"]
+    assert other["a"].tolist() == [1.0, 2.0, 3.0] and list(other.columns) == ["a", "b"]
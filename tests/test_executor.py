@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from executor import ProcessExecutor  # noqa: E402
+from store import DatasetStore  # noqa: E402
+from tools import ToolError, compute_histogram  # noqa: E402
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(6)
+    return pd.DataFrame({"value": rng.normal(size=5000), "city": rng.choice(["Delhi", "Pune"], 5000)})
+
+
+@pytest.fixture
+def executor(tmp_path, frame):
+    store = DatasetStore(str(tmp_path))
+    store.put("k", frame)
+    executor = ProcessExecutor(store, max_workers=1, timeout=60)
+    yield executor
+    executor.shutdown()
+
+
+def test_worker_result_matches_inline_compute(executor, frame):
+    result = executor.run("histogram", frame, {"column": "value"}, compute_histogram, "k")
+    expected = compute_histogram(frame, column="value")
+    np.testing.assert_array_equal(result.counts, expected.counts)
+    np.testing.assert_allclose(result.edges, expected.edges)
+    assert executor._idle.qsize() == 1  # the worker is kept for the next task
+
+
+def test_dataset_outside_the_store_is_computed_inline(executor, frame):
+    result = executor.run("histogram", frame, {"column": "value"}, compute_histogram, "missing")
+    assert result.column == "value" and executor._started == 0
+
+
+def test_dead_idle_worker_becomes_tool_error(executor, frame):
+    executor.run("histogram", frame, {"column": "value"}, compute_histogram, "k")
+    worker = executor._idle.queue[0]
+    worker.process.kill()
+    worker.process.join()
+    with pytest.raises(ToolError, match="stopped unexpectedly"):
+        executor.run("histogram", frame, {"column": "value"}, compute_histogram, "k")
+    assert executor._started == 0  # discarded, so the next task starts a new worker
+    assert executor.run("histogram", frame, {"column": "value"}, compute_histogram, "k").column == "value"
+
+
+def test_compute_error_in_worker_becomes_tool_error(executor, frame):
+    with pytest.raises(ToolError, match="histogram computation failed: KeyError"):
+        executor.run("histogram", frame, {"column": "missing"}, compute_histogram, "k")
+    assert executor._idle.qsize() == 1  # the worker itself is fine
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools import groupby
+from tools.groupby import AGGREGATIONS, GroupCube
+
+
+@pytest.fixture
+def grouped():
+    rng = np.random.default_rng(3)
+    n = 20_000
+    frame = pd.DataFrame({
+        "group": rng.choice([f"g{i}" for i in range(40)] + [None], n),
+        "value": rng.exponential(5.0, n),
+    })
+    frame.loc[rng.random(n) < 0.1, "value"] = np.nan
+    frame.loc[frame["group"] == "g0", "value"] = np.nan  # a group with no values
+    frame.loc[frame.index[frame["group"] == "g1"][1:], "value"] = np.nan  # a group with one value
+    return frame
+
+
+@pytest.mark.parametrize("partition_max_groups", [groupby.PARTITION_MAX_GROUPS, 0])
+def test_group_cube_matches_groupby(grouped, monkeypatch, partition_max_groups):
+    # 0 sends every median through the single-sort path instead of per-group partitions
+    monkeypatch.setattr(groupby, "PARTITION_MAX_GROUPS", partition_max_groups)
+    actual = GroupCube(grouped["group"]).aggregates(grouped["value"])
+    expected = grouped.groupby("group")["value"].agg(AGGREGATIONS)
+    pd.testing.assert_frame_equal(actual.sort_index(), expected.sort_index(), check_dtype=False, rtol=1e-10)
+
+
+def test_group_cube_categorical_groups(grouped):
+    groups = grouped["group"].astype("category")
+    actual = GroupCube(groups).aggregates(grouped["value"])
+    expected = grouped.groupby(groups, observed=True)["value"].agg(AGGREGATIONS)
+    pd.testing.assert_frame_equal(actual.sort_index(), expected.sort_index(), check_dtype=False,
+                                  check_index_type=False, check_categorical=False, rtol=1e-10)
@@ -0,0 +1,86 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest import read_csv_chunked
+
+ROWS = 30_000
+LATE_ROW = 25_000  # past the 20,000-row sample
+
+
+def csv_upload(frame: pd.DataFrame) -> io.BytesIO:
+    """The frame as an in-memory upload, like Streamlit's UploadedFile (a BytesIO)."""
+    return io.BytesIO(frame.to_csv(index=False).encode())
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "reading": np.round(rng.gamma(2.0, 10.0, ROWS), 1),
+        "city": rng.choice(["Delhi", "Mumbai", "Pune"], ROWS),
+        "date": pd.date_range("2020-01-01", periods=ROWS, freq="h").strftime("%d-%m-%Y %H:%M"),
+        "count": rng.integers(0, 100, ROWS),
+    })
+
+
+def load(frame, chunk_rows=10_000):
+    df, _ = read_csv_chunked(csv_upload(frame), chunk_rows=chunk_rows)
+    return df
+
+
+def test_compact_dtypes(frame):
+    df = load(frame)
+    assert df["reading"].dtype == np.float32
+    assert isinstance(df["city"].dtype, pd.CategoricalDtype)
+    assert df["date"].dtype == "datetime64[ns]"
+    assert df["count"].dtype == np.int8
+    expected = pd.read_csv(csv_upload(frame))
+    for column in ["reading", "city", "count"]:
+        assert df[column].astype(str).tolist() == expected[column].astype(str).tolist()
+    pd.testing.assert_series_equal(df["date"], pd.to_datetime(expected["date"], format="%d-%m-%Y %H:%M"))
+
+
+def test_float32_values_read_as_written(frame):
+    df = load(frame)
+    assert df["reading"].astype(str).tolist() == frame["reading"].astype(str).tolist()
+
+
+def test_text_after_sample_rereads_file_object(frame):
+    frame["reading"] = frame["reading"].astype(object)
+    frame.loc[LATE_ROW, "reading"] = "oops"
+    df = load(frame)
+    assert df.loc[LATE_ROW, "reading"] == "oops"
+    assert df["reading"].astype(str).tolist() == pd.read_csv(csv_upload(frame))["reading"].astype(str).tolist()
+
+
+def test_float_beyond_float32_is_kept(frame):
+    frame.loc[LATE_ROW, "reading"] = 1e300
+    df = load(frame)
+    assert df["reading"].dtype == np.float64
+    assert df.loc[LATE_ROW, "reading"] == 1e300
+
+
+def test_date_in_another_format_is_kept(frame):
+    frame.loc[LATE_ROW, "date"] = "2022/05/01"
+    df = load(frame)
+    assert df.loc[LATE_ROW, "date"] == "2022/05/01"
+    assert df["date"].notna().all()
+
+
+def test_large_float_ids_stay_distinct():
+    ids = np.arange(20_000_001, 20_000_001 + 2 * ROWS, 2, dtype=np.float64)
+    ids[::10] = np.nan  # missing values keep the column float
+    df, _ = read_csv_chunked(csv_upload(pd.DataFrame({"id": ids})))
+    np.testing.assert_array_equal(df["id"].to_numpy(dtype=np.float64), ids)
+
+
+def test_path_and_text_sources(tmp_path, frame):
+    path = tmp_path / "data.csv"
+    frame.to_csv(path, index=False)
+    from_path, _ = read_csv_chunked(str(path), chunk_rows=10_000)
+    from_text, _ = read_csv_chunked(io.StringIO(frame.to_csv(index=False)), chunk_rows=10_000)
+    pd.testing.assert_frame_equal(from_path, load(frame))
+    pd.testing.assert_frame_equal(from_text, load(frame))
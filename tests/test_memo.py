@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from tools.correlation import compute_correlation
+from tools.memo import ResultMemo, result_nbytes, run_stages
+
+
+def test_result_nbytes_counts_frames_arrays_and_moments():
+    df = pd.DataFrame(np.random.default_rng(0).normal(size=(1000, 40)), columns=[f"c{i}" for i in range(40)])
+    result = compute_correlation(df, list(df.columns))
+    matrices = 4 * 40 * 40 * 8  # n, sum, sum_sq and cross
+    assert result_nbytes(result) >= result.matrix.memory_usage(deep=True).sum() + matrices
+    assert result_nbytes(np.zeros(100)) == 800
+    series = pd.Series(np.zeros(100))
+    assert result_nbytes(series) == series.memory_usage(deep=True, index=True)
+
+
+def test_results_are_evicted_to_stay_within_budget():
+    memo = ResultMemo(max_bytes=20_000)
+    for i in range(5):
+        memo.put(("k", i), np.zeros(1000))  # 8,000 bytes each
+    assert len(memo) == 2 and ("k", 4) in memo and ("k", 0) not in memo
+    assert memo.stats()["bytes"] == 16_000
+
+
+def test_result_over_budget_is_returned_but_not_kept():
+    memo = ResultMemo(max_bytes=1000)
+    df = pd.DataFrame({"a": np.arange(1000.0)})
+    calls = []
+
+    def compute(frame):
+        calls.append(1)
+        return frame["a"].to_numpy().copy()
+
+    for _ in range(2):
+        result, image = run_stages("demo", df, {}, compute, memo=memo, dataset_key="k")
+        assert image is None and len(result) == 1000
+    assert len(calls) == 2 and len(memo) == 0
@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+
+from tools.pie import compute_pie
+
+
+def test_filter_on_categorical_drops_empty_slices():
+    df = pd.DataFrame({"city": pd.Categorical(["Delhi"] * 5 + ["Pune"] * 3 + ["Mumbai"] * 2)})
+    result = compute_pie(df, "records", "city", "city", "Delhi")
+    assert (result.labels, result.values, result.truncated) == (["Delhi"], [5], False)
+
+
+def test_float32_labels_read_as_written():
+    df = pd.DataFrame({"level": np.array([17.4, 17.4, 2.5, 0.1], dtype=np.float32)})
+    result = compute_pie(df, "numeric", "level")
+    assert result.labels == [17.4, 2.5, 0.1]
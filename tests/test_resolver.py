@@ -0,0 +1,38 @@
+import pytest
+
+from tools.resolver import ColumnResolver, normalize
+
+COLUMNS = ["city", "date", "aqi", "co", "no", "no2", "pm2_5", "pm10", "station_type"]
+NUMERIC = ["aqi", "co", "no", "no2", "pm2_5", "pm10"]
+CATEGORICAL = ["city", "station_type"]
+
+
+@pytest.fixture
+def resolver():
+    return ColumnResolver(COLUMNS, NUMERIC, CATEGORICAL)
+
+
+def test_normalize():
+    assert normalize("PM₂.₅ (µg/m³)") == "pm25gm"
+    assert normalize(2.5) == "25"
+
+
+def test_mentions_keep_the_longest_overlapping_name(resolver):
+    assert resolver.mentions("compare no2 and pm2.5") == [("no2", 7), ("pm2_5", 13)]
+
+
+def test_short_names_only_match_whole_tokens(resolver):
+    assert resolver.top_columns("compare the columns") == []
+    assert resolver.top_columns("co levels") == ["co"]
+
+
+def test_top_columns_in_mention_order(resolver):
+    assert resolver.top_columns("pm10 vs aqi vs co", 2) == ["pm10", "aqi"]
+    assert resolver.top_columns("pm10 vs aqi", 2, candidates=["aqi"]) == ["aqi"]
+
+
+def test_best_numeric_and_categorical(resolver):
+    assert resolver.best_numeric("average pm2.5 by city") == "pm2_5"
+    assert resolver.best_categorical("average pm2.5 by city") == "city"
+    assert resolver.best_categorical("aqi per station type") == "station_type"
+    assert resolver.best_numeric("how is the weather") is None
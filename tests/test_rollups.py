@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.rollups import SeriesRollups
+
+# The line tool's "M"/"Y" levels are deprecated pandas aliases
+pytestmark = pytest.mark.filterwarnings("ignore:'[MY]' is deprecated:FutureWarning")
+
+
+def series_frame(n_groups: int, days: int, rows: int, seed: int = 4):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "time": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, days * 24, rows), unit="h"),
+        "group": pd.Categorical(rng.integers(0, n_groups, rows).astype(str)),
+        "value": rng.normal(10.0, 3.0, rows).astype(np.float32),
+    })
+    frame.loc[rng.random(rows) < 0.05, "value"] = np.nan
+    frame.loc[rng.random(rows) < 0.01, "time"] = pd.NaT
+    return frame
+
+
+def expected_series(frame, group_value, level):
+    rows = frame if group_value is None else frame[frame["group"] == group_value]
+    return rows.dropna(subset=["time"]).set_index("time")["value"].astype(np.float64).resample(level).mean()
+
+
+@pytest.mark.parametrize("n_groups, days, rows", [
+    (5, 400, 50_000),   # dense (group, day) grid: one bincount
+    (3000, 1000, 5_000),  # sparse grid: hashed groupby fallback
+])
+def test_series_rollups_match_resample(n_groups, days, rows):
+    frame = series_frame(n_groups, days, rows)
+    before = frame.copy()
+    rollups = SeriesRollups(frame["time"], frame["value"], frame["group"])
+    ungrouped = SeriesRollups(frame["time"], frame["value"])
+    pd.testing.assert_frame_equal(frame, before)
+
+    checked = list(rollups.groups)[:5]
+    for level in ["D", "M", "Y"]:
+        for group_value in checked:
+            actual = rollups.series(group_value, level)
+            pd.testing.assert_series_equal(actual, expected_series(frame, group_value, level),
+                                           check_names=False, check_freq=False, rtol=1e-6)
+        pd.testing.assert_series_equal(ungrouped.series(None, level), expected_series(frame, None, level),
+                                       check_names=False, check_freq=False, rtol=1e-6)
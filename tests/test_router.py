@@ -0,0 +1,132 @@
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import router
+from route_cache import RouteCache
+
+# No keyword, no tool name: only the LLM can route it
+UNMATCHED = "which city should i move to"
+
+
+class StubLLM(BaseHTTPRequestHandler):
+    """Chat-completions endpoint answering with the server's `answer`, recording each request."""
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.client_address, body))
+        if self.server.status != 200:
+            self.send_response(self.server.status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        out = json.dumps({"choices": [{"message": {"content": self.server.answer}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubLLM)
+    server.requests, server.answer, server.status = [], " Bar\n", 200
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(router, "OPENAI_URL", f"http://127.0.0.1:{server.server_port}/v1/chat/completions")
+    monkeypatch.setattr(router, "route_cache", RouteCache())
+    monkeypatch.setattr(router, "classifier", None)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_llm_answer_is_used_and_cached(llm):
+    assert router.route_query_to_tool(UNMATCHED) == "bar"
+    assert router.route_query_to_tool(UNMATCHED.upper() + "?") == "bar"  # same normalized query
+    assert len(llm.requests) == 1
+    prompt = llm.requests[0][1]["messages"][0]["content"]
+    assert f'User Query: "{UNMATCHED}"' in prompt
+
+
+def test_requests_reuse_one_connection(llm):
+    for i in range(3):
+        router.route_query_to_tool(f"{UNMATCHED} {i}")
+    assert len(llm.requests) == 3
+    assert len({client for client, _ in llm.requests}) == 1
+
+
+def test_invalid_answer_or_error_falls_back_to_summary(llm):
+    llm.answer = "a bar chart, probably"
+    assert router.route_query_to_tool(UNMATCHED) == "summary"
+    llm.status = 500
+    assert router.route_query_to_tool(UNMATCHED + " again") == "summary"
+    assert router.route_cache.stats()["entries"] == 0
+
+
+def reference_match(query_lower):
+    """The original per-keyword `in` loop that match_tool replaces."""
+    for tool in router.TOOLS:
+        if tool in query_lower:
+            return tool
+    for tool in router.PLOT_PRIORITY:
+        if any(keyword in query_lower for keyword in router.KEYWORD_MAP[tool]):
+            return tool
+    return None
+
+
+@pytest.mark.parametrize("query, tool", [
+    ("show a histogram of the trend", "histogram"),  # an explicit name beats keywords
+    ("pie and bar please", "bar"),  # explicit names in TOOLS order
+    ("compare the trend", "line"),  # keywords in PLOT_PRIORITY order
+    ("correlation matrix of everything", "correlation"),
+    ("pm2_5 versus pm10", "scatter"),
+    ("tell me about the data", "summary"),
+    ("which city should i move to", None),
+])
+def test_match_tool(query, tool):
+    assert router.match_tool(query) == tool
+
+
+def test_match_tool_agrees_with_reference_scan():
+    words = [w for words in router.KEYWORD_MAP.values() for w in words] + router.TOOLS + ["of", "the", "aqi"]
+    rng = random.Random(0)
+    for _ in range(3000):
+        query = " ".join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+        assert router.match_tool(query) == reference_match(query), query
+
+
+def test_match_tools_reports_overlapping_hits():
+    hits = router.match_tools("correlation matrix")
+    assert ("explicit", "correlation", 0) in hits
+    assert ("keyword", "scatter", 0) in hits
+    assert ("keyword", "correlation", 0) in hits
+
+
+class ConfidentClassifier:
+    def predict(self, query):
+        return "pie", 1.0
+
+
+def test_cached_llm_answer_beats_the_classifier(llm, monkeypatch):
+    assert router.route_query_to_tool(UNMATCHED) == "bar"
+    monkeypatch.setattr(router, "classifier", ConfidentClassifier())
+    assert router.route_query_to_tool(UNMATCHED) == "bar"
+    assert router.route_query_to_tool(UNMATCHED + " now") == "pie"
+    assert len(llm.requests) == 1
+
+
+
+
+def test_batch_routes_pending_queries_in_one_request(llm):
+    llm.answer = "1: line\n2: pie"
+    tools = router.route_queries(["show the trend of aqi", UNMATCHED, "what about rainfall", UNMATCHED])
+    assert tools == ["line", "line", "pie", "line"]
+    assert len(llm.requests) == 1
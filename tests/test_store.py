@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from store import DatasetStore  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DatasetStore(str(tmp_path))
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "city": pd.Categorical(["Delhi", "Pune", None, "Delhi"]),
+        "date": pd.to_datetime(["2020-01-01", "2020-01-02", None, "2020-01-04"]),
+        "value": np.array([1.5, np.nan, 3.25, 4.0], dtype=np.float32),
+        "count": np.array([1, 2, 3, 4], dtype=np.int8),
+    }, index=[10, 11, 12, 13])
+
+
+def test_round_trip_keeps_dtypes(store, frame):
+    store.put("k", frame)
+    assert "k" in store and "other" not in store
+    pd.testing.assert_frame_equal(store.read("k"), frame.reset_index(drop=True))
+
+
+def test_reads_only_requested_columns(store, frame):
+    store.put("k", frame)
+    pd.testing.assert_frame_equal(store.read("k", ["value", "city"]),
+                                  frame[["value", "city"]].reset_index(drop=True))
+
+
+def test_head(store, frame):
+    store.put("k", frame)
+    pd.testing.assert_frame_equal(store.head("k", 2), frame.head(2).reset_index(drop=True))
+
+
+def test_put_leaves_no_temporary_files(store, frame, tmp_path):
+    store.put("k", frame)
+    store.put("k", frame)  # already stored: a no-op
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["k.arrow"]
+
+
+def test_profile_round_trip_and_version(store):
+    store.put_profile("k", {"columns": ["a"]}, version=2)
+    assert store.read_profile("k", 2) == {"columns": ["a"]}
+    assert store.read_profile("k", 3) is None
+    assert store.read_profile("missing", 2) is None
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.histogram import compute_histogram
+from tools.streaming import Moments, QuantileSketch, iter_chunks
+
+
+def uneven_chunks(values, sizes=(1, 7, 1000, 25_000)):
+    """Split `values` into chunks of cycling, unequal sizes."""
+    start, i = 0, 0
+    while start < len(values):
+        size = sizes[i % len(sizes)]
+        yield values[start:start + size]
+        start, i = start + size, i + 1
+
+
+@pytest.fixture
+def skewed():
+    rng = np.random.default_rng(0)
+    values = rng.gamma(2.0, 10.0, 200_000) + 1e6  # a large offset stresses the moment merge
+    values[rng.random(len(values)) < 0.02] = np.nan
+    return values
+
+
+def test_moments_merge_matches_pandas(skewed):
+    moments = Moments()
+    for chunk in uneven_chunks(skewed):
+        moments.update(chunk)
+    expected = pd.Series(skewed)
+    assert moments.n == expected.count()
+    assert moments.mean == pytest.approx(expected.mean(), rel=1e-12)
+    assert moments.std == pytest.approx(expected.std(), rel=1e-9)
+    assert moments.skew == pytest.approx(expected.skew(), rel=1e-6)
+    assert moments.kurtosis == pytest.approx(expected.kurtosis(), rel=1e-6)
+    assert (moments.min, moments.max) == (np.nanmin(skewed), np.nanmax(skewed))
+
+
+def test_moments_merge_of_partials_equals_single_pass(skewed):
+    half = len(skewed) // 2
+    merged = Moments().update(skewed[:half]).merge(Moments().update(skewed[half:]))
+    whole = Moments().update(skewed)
+    for attr in ("n", "mean", "m2", "m3", "m4", "min", "max"):
+        assert getattr(merged, attr) == pytest.approx(getattr(whole, attr), rel=1e-9)
+
+
+def test_iter_chunks_converts_series_with_missing_values():
+    series = pd.Series([1.5, None, 3.0], dtype="Float64")
+    chunks = list(iter_chunks(series, chunk_rows=2))
+    assert [chunk.dtype for chunk in chunks] == [np.float64, np.float64]
+    np.testing.assert_array_equal(np.concatenate(chunks), [1.5, np.nan, 3.0])
+
+
+def test_quantile_sketch_is_exact_for_small_inputs():
+    values = np.random.default_rng(1).normal(size=1000)
+    sketch = QuantileSketch().update(values)
+    q = [0.1, 0.5, 0.9]
+    # Raw values interpolated between midpoints: within one value's rank of np.quantile
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(q)) / len(values)
+    np.testing.assert_allclose(ranks, q, atol=1 / len(values))
+
+
+def test_quantile_sketch_compresses_within_rank_error(skewed):
+    sketch = QuantileSketch()
+    for chunk in uneven_chunks(skewed):
+        sketch.update(chunk)
+    finite = np.sort(skewed[~np.isnan(skewed)])
+    assert sketch.count == len(finite)
+    assert len(sketch.means) < 20 * sketch.compression
+    q = np.array([0.001, 0.01, 0.25, 0.5, 0.75, 0.99, 0.999])
+    ranks = np.searchsorted(finite, sketch.quantile(q)) / len(finite)
+    np.testing.assert_allclose(ranks, q, atol=0.002)
+
+
+def test_quantile_sketch_merge(skewed):
+    half = len(skewed) // 2
+    merged = QuantileSketch().update(skewed[:half]).merge(QuantileSketch().update(skewed[half:]))
+    finite = np.sort(skewed[~np.isnan(skewed)])
+    q = np.array([0.05, 0.5, 0.95])
+    ranks = np.searchsorted(finite, merged.quantile(q)) / len(finite)
+    np.testing.assert_allclose(ranks, q, atol=0.002)
+
+
+def test_histogram_counts_every_finite_value(skewed):
+    result = compute_histogram(pd.DataFrame({"x": skewed.astype(np.float32)}), "x")
+    finite = skewed[np.isfinite(skewed)].astype(np.float32)
+    assert result.counts.sum() == len(finite)
+    expected, _ = np.histogram(finite.astype(np.float64), bins=result.edges)
+    # Values on an inner edge may land in either neighbouring bin
+    assert np.abs(result.counts - expected).sum() <= 2 * (len(result.edges) - 2)
+    assert result.stats["Mean"] == pytest.approx(float(np.mean(finite, dtype=np.float64)), rel=1e-9)
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from test_streaming import skewed, uneven_chunks  # noqa: F401
+from tools.streaming import ReservoirSample
+from tools.summary import compute_summary
+
+
+def test_reservoir_bounds_bracket_true_quantiles(skewed):
+    first, second = ReservoirSample(5_000, seed=1), ReservoirSample(5_000, seed=2)
+    for chunk in uneven_chunks(skewed[:100_000]):
+        first.update(chunk)
+    second.update(skewed[100_000:])
+    sample = first.merge(second)
+    assert len(sample.values) == 5_000
+    assert sample.seen == np.isfinite(skewed).sum()
+    q = [0.25, 0.5, 0.75]
+    low, high = sample.quantile_bounds(q)
+    truth = np.nanquantile(skewed, q)
+    assert np.all(low <= truth) and np.all(truth <= high)
+
+
+@pytest.fixture
+def mixed():
+    rng = np.random.default_rng(5)
+    n = 1000
+    return pd.DataFrame({
+        "date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+        "value": rng.normal(size=n).astype(np.float32),
+        "city": pd.Categorical(rng.choice(["Delhi", "Pune"], n)),
+    })
+
+
+def test_statistics_match_describe(mixed):
+    result = compute_summary(mixed)
+    expected = mixed[["value"]].astype(np.float64).describe()
+    pd.testing.assert_frame_equal(result.statistics, expected, rtol=1e-6)
+    assert result.date_statistics.loc["count", "date"] == "1,000"
+    assert result.date_statistics.loc["min", "date"] == str(mixed["date"].min())
+
+
+@pytest.mark.parametrize("sample_rows", [None, 100])
+def test_every_frame_converts_to_arrow(mixed, sample_rows):
+    pa = pytest.importorskip("pyarrow")
+    frames = [compute_summary(mixed, sample_rows), compute_summary(mixed[["city"]], sample_rows)]
+    for result in frames:
+        for frame in (result.dtypes, result.statistics, result.date_statistics, result.missing, result.margins):
+            if frame is not None:
+                pa.Table.from_pandas(pd.DataFrame(frame))
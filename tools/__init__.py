@@ -1,11 +1,16 @@
 # Maps tool names to function handlers
-from .summary import show_summary
-from .scatter import plot_scatter
-from .line import plot_line
-from .bar import plot_bar
-from .histogram import plot_histogram
-from .correlation import plot_correlation
-from .pie import plot_pie
+from .base import ToolError, first_option
+from .canvas import apply_theme, new_figure, close_figure
+from .figure_cache import FigureCache, figure_bytes
+from .memo import ResultMemo, run_stages
+from .profile import DatasetProfile, build_profile, PROFILE_VERSION
+from .summary import show_summary, resolve_summary, compute_summary, render_summary
+from .scatter import plot_scatter, resolve_scatter, compute_scatter, draw_scatter, render_scatter
+from .line import plot_line, resolve_line, compute_line, cached_compute_line, draw_line, render_line
+from .bar import plot_bar, bar_columns, resolve_bar, compute_bar, cached_compute_bar, draw_bar, render_bar
+from .histogram import plot_histogram, histogram_columns, resolve_histogram, compute_histogram, draw_histogram, render_histogram
+from .correlation import plot_correlation, resolve_correlation, compute_correlation, draw_correlation, render_correlation
+from .pie import plot_pie, resolve_pie, compute_pie, draw_pie, render_pie
 
 TOOL_FUNCTIONS = {
     "summary": show_summary,
@@ -16,3 +21,40 @@ TOOL_FUNCTIONS = {
     "correlation": plot_correlation,
     "pie": plot_pie,
 }
+
+# Streamlit-free stages of each tool: resolve(query, profile, choose) -> params,
+# compute(df, **params) -> result, draw(result) -> matplotlib figure (or None)
+TOOL_STAGES = {
+    "summary": (resolve_summary, compute_summary, None),
+    "scatter": (resolve_scatter, compute_scatter, draw_scatter),
+    "line": (resolve_line, compute_line, draw_line),
+    "bar": (resolve_bar, compute_bar, draw_bar),
+    "histogram": (resolve_histogram, compute_histogram, draw_histogram),
+    "correlation": (resolve_correlation, compute_correlation, draw_correlation),
+    "pie": (resolve_pie, compute_pie, draw_pie),
+}
+
+# Streamlit stage of each tool: render(result, image) writes the output to the page
+TOOL_RENDERERS = {
+    "summary": render_summary,
+    "scatter": render_scatter,
+    "line": render_line,
+    "bar": render_bar,
+    "histogram": render_histogram,
+    "correlation": render_correlation,
+    "pie": render_pie,
+}
+
+# Tools that only touch a few columns; each resolver maps (query, profile)
+# to the columns needed, or None when the user still has to choose them
+COLUMN_RESOLVERS = {
+    "bar": bar_columns,
+    "histogram": histogram_columns,
+}
+
+# Compute stages that keep per-dataset precomputations (rollups, group cubes)
+# in a RollupCache: factory(rollups, dataset_key) -> compute(df, **params)
+CACHED_COMPUTE = {
+    "bar": cached_compute_bar,
+    "line": cached_compute_line,
+}
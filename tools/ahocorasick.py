@@ -0,0 +1,71 @@
+from collections import deque
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher.
+
+    Every pattern is added once with a payload; `find` then reports all
+    occurrences of all patterns in a text with a single left-to-right pass,
+    independent of how many patterns there are.
+
+    Call `build` once all patterns are added: matchers shared between
+    threads are then only ever read. (A `find` before `build` builds the
+    links itself, publishing them in one assignment, so a racing build
+    can't leave them half-made.)
+    """
+
+    def __init__(self, patterns=()):
+        self._goto = [{}]
+        self._own = [[]]
+        self._links = None  # (failure links, outputs) once built
+        for pattern, payload in patterns:
+            self.add(pattern, payload)
+
+    def add(self, pattern: str, payload=None):
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._own.append([])
+            state = nxt
+        self._own[state].append((len(pattern), payload))
+        self._links = None
+
+    def build(self):
+        """Compute the failure links and outputs; returns self."""
+        goto = self._goto
+        fail = [0] * len(goto)
+        out = [list(own) for own in self._own]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                fail[nxt] = goto[link].get(char, 0)
+                # Inherit matches that end here through the failure link
+                out[nxt] += out[fail[nxt]]
+        self._links = (fail, out)
+        return self
+
+    def find(self, text: str):
+        """Yield (start, end, payload) for every pattern occurrence in `text`."""
+        links = self._links or self.build()._links
+        goto, (fail, out) = self._goto, links
+        state = 0
+        for pos, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, payload in out[state]:
+                yield pos + 1 - length, pos + 1, payload
+
+    def __len__(self):
+        return len(self._goto)
@@ -1,136 +1,24 @@
 import streamlit as st
 import matplotlib.pyplot as plt
 import pandas as pd
-import re
 import numpy as np
 import seaborn as sns  # Add this at the top
+from dataclasses import dataclass
+from .base import ToolError, first_option
+from .canvas import new_figure
+from .groupby import AGGREGATIONS, GroupCube
+from .memo import ResultMemo, run_stages
+from .profile import DatasetProfile, build_profile
+from .rollups import RollupCache
 
 
-def normalize(text):
-    """Normalize text, including subscript to digit mapping."""
-    if not isinstance(text, str):
-        text = str(text)
-    subscripts = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
-    text = text.translate(subscripts)
-    return re.sub(r'[^a-zA-Z0-9]', '', text.lower())
-
-def extract_numeric_column(query: str, df: pd.DataFrame):
-    """Extract numeric column by comparing normalized tokens to normalized column names."""
-    numeric_cols = df.select_dtypes(include=["float64", "int64", "int32"]).columns.tolist()
-    if not numeric_cols:
-        return None
-
-    def normalize_token(token):
-        subscripts = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
-        token = token.translate(subscripts)
-        return re.sub(r'[^a-zA-Z0-9]', '', token.lower())
-
-    # Normalize individual tokens from the query
-    query_tokens = query.lower().split()
-    norm_query_tokens = [normalize_token(token) for token in query_tokens]
-
-    best_match = None
-    best_score = 0
-
-    for col in numeric_cols:
-        score = 0
-        norm_col = normalize_token(col)
-
-        # Score exact token match
-        if norm_col in norm_query_tokens:
-            score += 3
-
-        # Score partial matches
-        for token in norm_query_tokens:
-            if token in norm_col:
-                score += 2
-            elif norm_col in token:
-                score += 1
-
-        # Update best match
-        if score > best_score:
-            best_score = score
-            best_match = col
-
-    return best_match
- 
-
-def extract_categorical_column(query: str, df: pd.DataFrame):
-    """Extract categorical column from query based on context and common patterns."""
-    categorical_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
-    if not categorical_cols:
-        return None
-        
-    norm_query = normalize(query)
-    query_lower = query.lower()
-    
-    # Common grouping patterns in natural language
-    grouping_patterns = [
-        # Format: (keyword, score)
-        ("group by", 3),
-        ("grouped by", 3),
-        ("split by", 3),
-        ("break down by", 3),
-        ("categorize by", 3),
-        ("categorized by", 3),
-        ("per", 2),
-        ("for each", 2),
-        ("across", 2),
-        ("by", 1),
-        ("in", 1),
-        ("at", 1)
-    ]
-    
-    # Common categorical column types
-    category_indicators = [
-        # Format: (keyword, score)
-        ("type", 2),
-        ("category", 2),
-        ("class", 2),
-        ("group", 2),
-        ("name", 2),
-        ("id", 1),
-        ("code", 1),
-        ("status", 2),
-        ("level", 1),
-        ("grade", 1)
-    ]
-    
-    best_match = None
-    best_score = 0
-    
-    for col in categorical_cols:
-        score = 0
-        col_lower = col.lower()
-        
-        # Check for explicit grouping patterns
-        for pattern, pattern_score in grouping_patterns:
-            if pattern in query_lower:
-                after_pattern = query_lower.split(pattern)[-1].strip()
-                if normalize(col) in normalize(after_pattern):
-                    score += pattern_score * 2
-                    
-        # Check if column name contains category indicators
-        for indicator, indicator_score in category_indicators:
-            if indicator in col_lower:
-                score += indicator_score
-                
-        # Check for direct mention in query
-        if normalize(col) in norm_query:
-            score += 3
-            
-        # Check for column parts in query
-        col_parts = set(word.strip() for word in col_lower.split())
-        query_parts = set(word.strip() for word in query_lower.split())
-        matching_parts = col_parts.intersection(query_parts)
-        score += len(matching_parts)
-        
-        # Update best match if we found a better score
-        if score > best_score:
-            best_score = score
-            best_match = col
-            
-    return best_match
+def bar_columns(query: str, profile: DatasetProfile):
+    """Columns the bar chart needs for this query, or None if the user must pick them."""
+    numeric_col = profile.resolver.best_numeric(query)
+    group_col = profile.resolver.best_categorical(query)
+    if numeric_col and group_col:
+        return [group_col, numeric_col]
+    return None
 
 def determine_aggregation(query: str):
     """Determine the aggregation method from query context."""
@@ -164,69 +52,179 @@ def determine_aggregation(query: str):
     # Default to mean if no clear winner
     return best_method if scores[best_method] > 0 else "mean"
 
-def plot_bar(df: pd.DataFrame, query: str = ""):
-    """Create a bar chart based on the query using seaborn."""
-    st.subheader("Bar Chart")
-    
-    if df.empty:
-        st.warning("No data available for plotting.")
-        return
-        
+# Above this many groups only the top TOP_K are drawn, the rest folded into "Other"
+MAX_GROUPS = 25
+TOP_K = 20
+OTHER_LABEL = "Other"
+
+@dataclass
+class BarResult:
+    """Aggregated values per group, sorted from largest to smallest.
+
+    With more than MAX_GROUPS groups, `grouped_data` holds the TOP_K largest
+    followed by an "Other" row for the remaining `other_groups` (no row when
+    the aggregation can't be combined, e.g. median); `stats` cover every group.
+    """
+    numeric_col: str
+    group_col: str
+    agg_method: str
+    grouped_data: pd.DataFrame
+    stats: dict
+    other_groups: int = 0
+
+def resolve_bar(query: str, profile: DatasetProfile, choose=first_option):
+    """Pick the numeric column, grouping column and aggregation for the query.
+
+    `choose(label, options)` is called for anything the query doesn't name.
+    """
     # Extract columns from query
-    numeric_col = extract_numeric_column(query, df)
-    group_col = extract_categorical_column(query, df)
+    numeric_col = profile.resolver.best_numeric(query)
+    group_col = profile.resolver.best_categorical(query)
     
     # Let user select columns if not found in query
     if not numeric_col:
-        numeric_cols = df.select_dtypes(include=["float64", "int64", "int32"]).columns
-        if len(numeric_cols) == 0:
-            st.error("No numeric columns found in the dataset.")
-            return
-        numeric_col = st.selectbox("Select a numeric column to plot:", numeric_cols)
+        if len(profile.numeric_cols) == 0:
+            raise ToolError("No numeric columns found in the dataset.")
+        numeric_col = choose("Select a numeric column to plot:", profile.numeric_cols)
         
     if not group_col:
-        categorical_cols = df.select_dtypes(include=["object", "category"]).columns
-        if len(categorical_cols) == 0:
-            st.error("No categorical columns found for grouping.")
-            return
-        group_col = st.selectbox("Select a column to group by:", categorical_cols)
-    
-    # Determine aggregation method
-    agg_method = determine_aggregation(query)
-    
-    # Group and aggregate the data
-    grouped_data = df.groupby(group_col)[numeric_col].agg(agg_method).reset_index()
-    
-    # Sort values for better visualization
-    grouped_data = grouped_data.sort_values(numeric_col, ascending=False)
-    
+        if len(profile.categorical_cols) == 0:
+            raise ToolError("No categorical columns found for grouping.")
+        group_col = choose("Select a column to group by:", profile.categorical_cols)
+
+    return {"numeric_col": numeric_col, "group_col": group_col, "agg_method": determine_aggregation(query)}
+
+def group_aggregates(df: pd.DataFrame, group_col: str, numeric_col: str, agg_methods, cube: GroupCube = None):
+    """Several aggregations of `numeric_col` per group, from `cube` if given."""
+    cube = cube or GroupCube(df[group_col])
+    return cube.aggregates(df[numeric_col])[list(agg_methods)]
+
+def compute_bar(df: pd.DataFrame, numeric_col: str, group_col: str, agg_method: str, aggregates=None,
+                cube: GroupCube = None) -> BarResult:
+    """Group and aggregate the data.
+
+    `aggregates` may hold a precomputed group_aggregates() frame, and `cube` a
+    GroupCube of `group_col` that already has (or will keep) this column's aggregates.
+    """
+    if aggregates is None or agg_method not in aggregates:
+        aggregates = group_aggregates(df, group_col, numeric_col, AGGREGATIONS, cube)
+    values = aggregates[agg_method]
+    stats = {"mean": values.mean(), "min": values.min(), "max": values.max(), "groups": len(values)}
+
+    if len(values) <= MAX_GROUPS:
+        # Sort values for better visualization
+        grouped_data = values.rename(numeric_col).reset_index().sort_values(numeric_col, ascending=False)
+        return BarResult(numeric_col, group_col, agg_method, grouped_data, stats)
+
+    # Partial selection: only the top k are ever sorted, however many groups there are
+    ranked = np.nan_to_num(values.to_numpy(dtype=np.float64), nan=-np.inf)
+    top = np.argpartition(-ranked, TOP_K - 1)[:TOP_K]
+    top = top[np.argsort(-ranked[top], kind="stable")]
+    rest = np.ones(len(values), dtype=bool)
+    rest[top] = False
+
+    grouped_data = pd.DataFrame({group_col: values.index[top].astype(str), numeric_col: values.to_numpy()[top]})
+    other = fold_other(aggregates.iloc[rest], agg_method)
+    if other is not None:
+        label = f"{OTHER_LABEL} ({rest.sum():,} groups)"
+        grouped_data.loc[len(grouped_data)] = [label, other]
+    return BarResult(numeric_col, group_col, agg_method, grouped_data, stats, other_groups=int(rest.sum()))
+
+def fold_other(aggregates: pd.DataFrame, agg_method: str):
+    """`agg_method` over all the rows of several groups combined, from their per-group aggregates.
+
+    Returns None when the aggregates needed to combine them are missing, or
+    for the median, which can't be recovered from per-group values.
+    """
+    columns = set(aggregates)
+    if agg_method in ("sum", "count", "min", "max") and agg_method in columns:
+        column = aggregates[agg_method]
+        return {"sum": column.sum, "count": column.sum, "min": column.min, "max": column.max}[agg_method]()
+    if not {"count", "sum"} <= columns:
+        return None
+    n, total = aggregates["count"], aggregates["sum"]
+    if agg_method == "mean":
+        return total.sum() / n.sum() if n.sum() else np.nan
+    if agg_method == "std" and "std" in columns and n.sum() > 1:
+        # Pooled variance: within-group spread plus spread of the group means
+        mean = total.sum() / n.sum()
+        within = ((n - 1) * aggregates["std"].fillna(0) ** 2).sum()
+        between = (n * (total / n.where(n > 0) - mean) ** 2).sum()
+        return float(np.sqrt((within + between) / (n.sum() - 1)))
+    return None
+
+def cached_compute_bar(rollups: RollupCache, dataset_key: str):
+    """compute_bar taking the group column's GroupCube from `rollups`, building it on first use.
+
+    The group column is then factorized once per dataset, and each value column aggregated once.
+    """
+    def compute(df, group_col, **params):
+        cube = rollups.get_or_build((dataset_key, "groupby", group_col), lambda: GroupCube(df[group_col]))
+        return compute_bar(df, group_col=group_col, cube=cube, **params)
+    return compute
+
+def draw_bar(result: BarResult):
+    """Draw the bar chart for a computed result and return the figure."""
+    numeric_col, group_col, agg_method = result.numeric_col, result.group_col, result.agg_method
+    grouped_data = result.grouped_data
+
     # Create the seaborn bar plot
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig, ax = new_figure(figsize=(10, 6))
     sns.barplot(data=grouped_data, x=group_col, y=numeric_col, palette='Set2', ax=ax)
+    if result.other_groups and len(grouped_data) > TOP_K:
+        ax.patches[-1].set_facecolor("lightgrey")  # the folded "Other" bar
     
     # Customize the plot
     ax.set_xlabel(group_col)
     ax.set_ylabel(f"{agg_method.capitalize()} of {numeric_col}")
-    ax.set_title(f"{numeric_col} by {group_col} ({agg_method})")
+    title = f"{numeric_col} by {group_col} ({agg_method})"
+    if result.other_groups:
+        title += f"\nTop {TOP_K} of {result.stats['groups']:,} groups"
+    ax.set_title(title)
     
     # Rotate x-axis labels if there are many categories
     if len(grouped_data) > 5:
-        plt.xticks(rotation=45, ha='right')
+        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
     
     # Add value labels on top of bars
     for container in ax.containers:
         ax.bar_label(container, fmt='%.1f', label_type='edge', padding=3)
     
     # Adjust layout
-    plt.tight_layout()
-    
+    fig.tight_layout()
+    return fig
+
+def render_bar(result: BarResult, image):
+    """Show a computed bar chart and its summary statistics in Streamlit."""
     # Display the plot
-    st.pyplot(fig)
+    st.image(image)
     
     # Show summary statistics
     st.write("\nSummary Statistics:")
-    stats = grouped_data[numeric_col].describe()
-    st.write(f"- Average {numeric_col}: {stats['mean']:.2f}")
+    stats = result.stats
+    st.write(f"- Average {result.numeric_col}: {stats['mean']:.2f}")
     st.write(f"- Minimum: {stats['min']:.2f}")
     st.write(f"- Maximum: {stats['max']:.2f}")
-    st.write(f"- Number of groups: {len(grouped_data)}")
+    st.write(f"- Number of groups: {stats['groups']}")
+    if result.other_groups:
+        st.caption(f"Showing the top {TOP_K} groups; the other {result.other_groups:,} are "
+                   f"{'combined into one bar' if len(result.grouped_data) > TOP_K else 'not shown'}.")
+
+def plot_bar(df: pd.DataFrame, query: str = "", profile: DatasetProfile = None, memo: ResultMemo = None, dataset_key: str = None, executor=None):
+    """Create a bar chart based on the query using seaborn."""
+    st.subheader("Bar Chart")
+    
+    if df.empty:
+        st.warning("No data available for plotting.")
+        return
+
+    profile = profile or build_profile(df)
+    compute = cached_compute_bar(memo.rollups, dataset_key) if memo is not None and dataset_key else compute_bar
+    try:
+        params = resolve_bar(query, profile, st.selectbox)
+        result, image = run_stages("bar", df, params, compute, draw_bar, memo, dataset_key, executor)
+    except ToolError as e:
+        getattr(st, e.level)(str(e))
+        return
+
+    render_bar(result, image)
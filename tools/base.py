@@ -0,0 +1,16 @@
+class ToolError(Exception):
+    """Raised when a tool cannot run on the given data or query.
+
+    `level` names how the Streamlit front end should show it
+    ("error" or "warning").
+    """
+
+    def __init__(self, message: str, level: str = "error"):
+        super().__init__(message)
+        self.level = level
+
+
+def first_option(label, options, index=0):
+    """Headless stand-in for st.selectbox: take the suggested option."""
+    options = list(options)
+    return options[index] if options else None
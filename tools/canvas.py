@@ -0,0 +1,37 @@
+import threading
+
+import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# Seaborn style used by every chart
+THEME = "whitegrid"
+
+_theme_lock = threading.Lock()
+_theme_applied = False
+
+
+def apply_theme():
+    """Set the global plotting theme, once per process."""
+    global _theme_applied
+    with _theme_lock:
+        if not _theme_applied:
+            sns.set_theme(style=THEME)
+            _theme_applied = True
+
+
+def new_figure(figsize=None):
+    """Return (fig, ax) on a private Agg canvas.
+
+    The figure is never registered with pyplot, so nothing keeps it alive
+    once the caller drops it; close_figure() frees its artists right away.
+    """
+    apply_theme()
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots()
+
+
+def close_figure(fig):
+    """Release a figure's artists (breaking their reference cycles) deterministically."""
+    fig.clear()
@@ -1,45 +1,144 @@
 # Correlation matrix tool
+import re
 import streamlit as st
-import seaborn as sns
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.spatial.distance import squareform
+from dataclasses import dataclass
+from .base import ToolError, first_option
+from .canvas import new_figure
+from .memo import ResultMemo, run_stages
+from .profile import DatasetProfile, build_profile
+from .streaming import CoMoments, iter_frame_chunks, top_pairs
 
-def plot_correlation(df, query=None):
-    st.subheader("Correlation Matrix")
-    
-    # Select only numeric columns
-    numeric_df = df.select_dtypes(include=['number'])
-    
-    if numeric_df.empty:
-        st.warning("No numeric columns found in the dataset.")
-        return
-    
-    if len(numeric_df.columns) < 2:
-        st.warning("Need at least 2 numeric columns to create a correlation matrix.")
-        return
-    
-    # Create correlation matrix
-    corr_matrix = numeric_df.corr()
-    
-    # Create heatmap
-    fig, ax = plt.subplots(figsize=(10, 8))
-    sns.heatmap(corr_matrix, 
-                annot=True,           # Show correlation values
-                fmt='.2f',           # Format to 2 decimal places
-                cmap='coolwarm',     # Color scheme
-                center=0,            # Center the colormap at 0
-                square=True,         # Make cells square
-                ax=ax)
-    
-    plt.title("Correlation Matrix of Numeric Variables")
-    
-    # Rotate x-axis labels for better readability
-    plt.xticks(rotation=45, ha='right')
-    plt.yticks(rotation=0)
-    
-    # Adjust layout to prevent label cutoff
-    plt.tight_layout()
-    
-    st.pyplot(fig)
+# Query words asking for rank (Spearman) rather than linear (Pearson) correlation
+SPEARMAN_WORDS = ("spearman", "rank", "monotonic")
+# Query words asking for similar variables to be placed next to each other
+CLUSTER_WORDS = ("cluster", "group similar", "reorder")
+# "top 20", "top-20 variables": zoom into the N most correlated variables
+TOP_N = re.compile(r"\btop[\s-]*(\d+)\b")
+# Above this many variables the user is offered a zoomed view
+ZOOM_OFFER = 20
+ZOOM_OPTIONS = ["all", 10, 20, 50]
+# Cell values are written only up to this many variables, tick labels up to LABEL_MAX
+ANNOTATE_MAX = 12
+LABEL_MAX = 40
+
+@dataclass
+class CorrelationResult:
+    """Correlation matrix of the numeric columns and its strongest pairs."""
+    matrix: pd.DataFrame
+    top_pairs: list  # (var1, var2, correlation)
+    method: str = "pearson"
+    moments: CoMoments = None  # Pearson only: extend with appended rows via moments.update()
+    display: list = None  # variables to draw, in order (all of them by default)
+
+def resolve_correlation(query, profile: DatasetProfile, choose=first_option):
+    """Correlation uses every numeric column; the query may ask for Spearman, clustering or a top-N zoom."""
+    if not profile.numeric_cols:
+        raise ToolError("No numeric columns found in the dataset.", level="warning")
+    if len(profile.numeric_cols) < 2:
+        raise ToolError("Need at least 2 numeric columns to create a correlation matrix.", level="warning")
+    query = (query or "").lower()
+    method = "spearman" if any(word in query for word in SPEARMAN_WORDS) else "pearson"
+    order = "cluster" if any(word in query for word in CLUSTER_WORDS) else "original"
+
+    top_n = None
+    match = TOP_N.search(query)
+    if match:
+        top_n = int(match.group(1))
+    elif len(profile.numeric_cols) > ZOOM_OFFER:
+        top_n = choose("Variables to show:", ZOOM_OPTIONS)
+    top_n = top_n if isinstance(top_n, int) and 2 <= top_n < len(profile.numeric_cols) else None
+    return {"columns": list(profile.numeric_cols), "method": method, "order": order, "top_n": top_n}
+
+def most_correlated(matrix: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the n variables with the strongest correlation to any other variable."""
+    strength = np.abs(np.where(np.isnan(matrix), 0.0, matrix))
+    np.fill_diagonal(strength, 0.0)
+    best = strength.max(axis=1)
+    keep = np.argpartition(-best, n - 1)[:n]
+    return np.sort(keep)
+
+def cluster_order(matrix: np.ndarray) -> np.ndarray:
+    """Leaf order of an average-linkage clustering on 1 - |r|, so related variables sit together."""
+    if len(matrix) < 3:
+        return np.arange(len(matrix))
+    distance = 1 - np.abs(np.where(np.isnan(matrix), 0.0, matrix))
+    np.fill_diagonal(distance, 0.0)
+    return leaves_list(linkage(squareform(distance, checks=False), method="average"))
+
+def correlation_result(moments: CoMoments, columns, method="pearson", k=5, order="original", top_n=None) -> CorrelationResult:
+    """Build the matrix and its top-k pairs (from the upper triangle) from accumulated co-moments."""
+    matrix = moments.correlation()
+    pairs = [(columns[i], columns[j], matrix[i, j]) for i, j in top_pairs(matrix, k)]
+
+    shown = np.arange(len(columns))
+    if top_n:
+        shown = most_correlated(matrix, top_n)
+    if order == "cluster":
+        shown = shown[cluster_order(matrix[np.ix_(shown, shown)])]
+    return CorrelationResult(pd.DataFrame(matrix, index=columns, columns=columns), pairs, method,
+                             moments if method == "pearson" else None, [columns[i] for i in shown])
+
+def correlation_from_chunks(chunks, columns, method="pearson", order="original", top_n=None) -> CorrelationResult:
+    """Correlation of `columns` from an iterable of 2D row blocks (NaN for missing values)."""
+    moments = CoMoments(len(columns))
+    for chunk in chunks:
+        moments.update(chunk)
+    return correlation_result(moments, list(columns), method, order=order, top_n=top_n)
+
+def compute_correlation(df, columns, method="pearson", order="original", top_n=None) -> CorrelationResult:
+    if method == "spearman":
+        # Spearman is Pearson on ranks; each column is ranked once, ignoring missing values
+        df = df[columns].rank()
+    return correlation_from_chunks(iter_frame_chunks(df, columns), columns, method, order, top_n)
+
+def draw_correlation(result: CorrelationResult):
+    """Draw the correlation heatmap and return the figure.
+
+    A single imshow image is drawn whatever the size; cell values and tick
+    labels are only added while the matrix is small enough to read them.
+    """
+    shown = result.display or list(result.matrix.columns)
+    matrix = result.matrix.loc[shown, shown].to_numpy()
+    n = len(shown)
+
+    fig, ax = new_figure(figsize=(10, 8))
+    cmap = plt.get_cmap("coolwarm").copy()
+    cmap.set_bad("#dddddd")
+    image = ax.imshow(np.ma.masked_invalid(matrix), cmap=cmap, vmin=-1, vmax=1, interpolation="nearest")
+    fig.colorbar(image, ax=ax, shrink=0.8)
+    ax.grid(False)
+
+    if n <= LABEL_MAX:
+        ax.set_xticks(range(n), shown)
+        ax.set_yticks(range(n), shown)
+        # Rotate x-axis labels for better readability
+        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+    else:
+        ax.set_xticks([])
+        ax.set_yticks([])
+
+    if n <= ANNOTATE_MAX:
+        # Show correlation values
+        for (i, j), value in np.ndenumerate(matrix):
+            if not np.isnan(value):
+                ax.text(j, i, f"{value:.2f}", ha="center", va="center", fontsize=9,
+                        color="white" if abs(value) > 0.6 else "black")
+
+    method = "" if result.method == "pearson" else f" ({result.method.capitalize()})"
+    title = f"Correlation Matrix of Numeric Variables{method}"
+    if n < len(result.matrix):
+        title += f"\nTop {n} of {len(result.matrix)} variables by strongest correlation"
+    ax.set_title(title)
+    return fig
+
+def render_correlation(result: CorrelationResult, image):
+    """Show a computed correlation heatmap and its strongest pairs in Streamlit."""
+    st.image(image)
     
     # Add correlation interpretation
     st.markdown("""
@@ -49,13 +148,21 @@ def plot_correlation(df, query=None):
     - Values close to 0 indicate little to no correlation
     """)
     
-    # Find and display strongest correlations
-    correlations = corr_matrix.unstack()
-    sorted_correlations = correlations[correlations != 1.0].abs().sort_values(ascending=False)
-    
-    if not sorted_correlations.empty:
+    # Display strongest correlations
+    if result.top_pairs:
         st.subheader("Strongest Correlations:")
-        for idx, value in sorted_correlations[:5].items():
-            var1, var2 = idx
-            if var1 != var2:
-                st.write(f"- {var1} vs {var2}: {corr_matrix.loc[var1, var2]:.2f}")
+        for var1, var2, value in result.top_pairs:
+            st.write(f"- {var1} vs {var2}: {value:.2f}")
+
+def plot_correlation(df, query=None, profile: DatasetProfile = None, memo: ResultMemo = None, dataset_key: str = None, executor=None):
+    st.subheader("Correlation Matrix")
+    
+    profile = profile or build_profile(df)
+    try:
+        params = resolve_correlation(query, profile, st.selectbox)
+        result, image = run_stages("correlation", df, params, compute_correlation, draw_correlation, memo, dataset_key, executor)
+    except ToolError as e:
+        getattr(st, e.level)(str(e))
+        return
+
+    render_correlation(result, image)
@@ -0,0 +1,43 @@
+import io
+import os
+
+from lru import LRUCache
+
+from .canvas import close_figure
+
+# Memory budget for rendered figures kept across reruns (in megabytes)
+DEFAULT_FIGURE_BUDGET_MB = int(os.getenv("CSV_EXPLORER_FIGURE_CACHE_MB", "128"))
+
+# Streamlit re-encodes any image wider than 1460px each time it is shown, so
+# 10-inch figures are rendered just under that instead of st.pyplot's 200 dpi
+FIGURE_DPI = 140
+
+
+def figure_bytes(fig, fmt: str = "png") -> bytes:
+    """Render a figure to PNG or SVG bytes, then close it."""
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format=fmt, dpi=FIGURE_DPI, bbox_inches="tight")
+    finally:
+        close_figure(fig)
+    return buffer.getvalue()
+
+
+class FigureCache(LRUCache):
+    """LRU cache of rendered figure bytes, bounded by total size.
+
+    Keys are (dataset hash, tool, resolved parameters), where the parameters
+    carry the columns and aggregation, so a repeated question or a widget
+    rerun is served without calling matplotlib.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_FIGURE_BUDGET_MB * 1024 * 1024, fmt: str = "png"):
+        super().__init__(max_bytes=max_bytes)
+        self.fmt = fmt
+
+    def sizeof(self, image: bytes) -> int:
+        return len(image)
+
+    def render(self, key, fig) -> bytes:
+        """Render `fig` in this cache's format and store it under `key`."""
+        return self.put(key, figure_bytes(fig, self.fmt))
@@ -0,0 +1,98 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Aggregations a GroupCube computes for every value column it is asked about
+AGGREGATIONS = ["count", "sum", "mean", "min", "max", "std", "median"]
+# Up to this many groups, medians come from a per-group partition; beyond it, from one sort
+PARTITION_MAX_GROUPS = 10_000
+
+
+def group_codes(groups: pd.Series):
+    """(int codes, unique values) of a group column; -1 marks missing.
+
+    Categorical columns already hold their codes, so no factorizing pass is needed.
+    """
+    if isinstance(groups.dtype, pd.CategoricalDtype):
+        return groups.cat.codes.to_numpy(), groups.cat.categories
+    return pd.factorize(groups.to_numpy())
+
+
+class GroupCube:
+    """Grouped aggregates of any number of value columns over one group column.
+
+    The group column is factorized and its rows ordered by group once; each
+    value column is then reduced segment by segment (np.add/minimum/maximum
+    .reduceat over the group-ordered values), giving all of AGGREGATIONS in
+    one vectorized pass. Results are kept per value column, so "average
+    pm2_5 by city" followed by "max pm2_5 by city" or "total co by city"
+    reuse both the factorization and, for the same column, the aggregates.
+    """
+
+    def __init__(self, groups: pd.Series):
+        self.group_col = groups.name
+        self._lock = threading.Lock()
+        self._aggregates = {}  # value column name -> DataFrame of AGGREGATIONS per group
+
+        codes, uniques = group_codes(groups)
+        present = codes >= 0  # rows with a missing group are left out, as groupby does
+        order = np.argsort(codes, kind="stable")
+        self._order = order if present.all() else order[present[order]]
+        sorted_codes = codes[self._order]
+        boundaries = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]] if len(sorted_codes) else []
+        self._starts = np.flatnonzero(boundaries)
+        self._sizes = np.diff(np.r_[self._starts, len(sorted_codes)])
+        self.index = pd.Index(np.asarray(uniques)[sorted_codes[self._starts]], name=self.group_col)
+
+    def __len__(self):
+        return len(self.index)
+
+    def aggregates(self, values: pd.Series) -> pd.DataFrame:
+        """AGGREGATIONS of `values` per group (one row per group, one column per aggregation).
+
+        Missing values are skipped, matching `df.groupby(group_col, observed=True)[col].agg(...)`.
+        """
+        with self._lock:
+            cached = self._aggregates.get(values.name)
+        if cached is not None:
+            return cached
+
+        frame = self._reduce(values.to_numpy(dtype=np.float64, na_value=np.nan)[self._order])
+        with self._lock:
+            self._aggregates[values.name] = frame
+        return frame
+
+    def _reduce(self, ordered: np.ndarray) -> pd.DataFrame:
+        starts = self._starts
+        if not len(starts):
+            return pd.DataFrame(columns=AGGREGATIONS, index=self.index, dtype=np.float64)
+        valid = ~np.isnan(ordered)
+        count = np.add.reduceat(valid, starts).astype(np.int64)
+        total = np.add.reduceat(np.where(valid, ordered, 0.0), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            low = np.minimum.reduceat(np.where(valid, ordered, np.inf), starts)
+            high = np.maximum.reduceat(np.where(valid, ordered, -np.inf), starts)
+            # Deviations from each group's own mean keep the variance well conditioned
+            deviation = np.where(valid, ordered - np.repeat(mean, self._sizes), 0.0)
+            std = np.sqrt(np.add.reduceat(deviation * deviation, starts) / (count - 1))
+        std[count < 2] = np.nan
+        empty = count == 0
+        low[empty], high[empty] = np.nan, np.nan
+
+        # Median: bring each group's middle pair into place (NaN sorts last) and average it
+        middle_lo = starts + np.maximum(count - 1, 0) // 2
+        middle_hi = starts + count // 2
+        if len(starts) <= PARTITION_MAX_GROUPS:
+            within = ordered.copy()
+            for start, stop, lo, hi in zip(starts, starts + self._sizes, middle_lo - starts, middle_hi - starts):
+                within[start:stop].partition([lo, hi])
+        else:
+            segment = np.repeat(np.arange(len(starts)), self._sizes)
+            within = ordered[np.lexsort((ordered, segment))]
+        median = (within[middle_lo] + within[middle_hi]) / 2
+        median[empty] = np.nan
+
+        return pd.DataFrame({"count": count, "sum": total, "mean": mean, "min": low, "max": high,
+                             "std": std, "median": median}, index=self.index)
@@ -1,140 +1,180 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 import pandas as pd
-import re
-from scipy import stats
-
-def normalize(text):
-    """Normalize text, including subscript to digit mapping."""
-    if not isinstance(text, str):
-        text = str(text)
-    subscripts = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
-    text = text.translate(subscripts)
-    return re.sub(r'[^a-zA-Z0-9]', '', text.lower())
-
-def extract_histogram_column(query: str, df: pd.DataFrame):
-    """Extract the most relevant numeric column for histogram based on query context."""
-    numeric_cols = df.select_dtypes(include=["float64", "int64", "int32"]).columns.tolist()
-    if not numeric_cols:
-        return None
-
-    # Normalize query and extract words
-    norm_query = normalize(query)
-    query_words = set(re.findall(r'[a-zA-Z]+|\d+', norm_query))
-
-    # Remove irrelevant histogram keywords
-    distribution_keywords = {
-        "distribution", "spread", "range", "frequency", "occurrence",
-        "pattern", "histogram", "density", "concentration"
-    }
-    query_words -= distribution_keywords
-
-    # Build normalized column map
-    normalized_col_map = {normalize(col): col for col in numeric_cols}
-
-    best_match = None
-    best_score = 0
-
-    for norm_col, original_col in normalized_col_map.items():
-        score = 0
-
-        if norm_col in norm_query:
-            score += 3
-
-        col_words = set(re.findall(r'[a-zA-Z]+|\d+', norm_col))
-        matching_parts = col_words & query_words
-        score += len(matching_parts) * 2
-
-        for word in query_words:
-            if word in norm_col:
-                score += 1
-
-        if score > best_score:
-            best_score = score
-            best_match = original_col
-
-    return best_match
-
-def determine_bins(data):
+from dataclasses import dataclass
+from .base import ToolError, first_option
+from .canvas import new_figure
+from .memo import ResultMemo, run_stages
+from .profile import DatasetProfile, build_profile
+from .streaming import Moments, QuantileSketch, finite, iter_chunks, binned_kde, linear_bin
+
+# Upper bound on histogram bars, however large the data
+MAX_BINS = 200
+# Grid points the KDE is binned onto before smoothing
+KDE_GRID = 1024
+
+def histogram_columns(query: str, profile: DatasetProfile):
+    """Columns the histogram needs for this query, or None if the user must pick one."""
+    column = profile.resolver.best_numeric(query)
+    return [column] if column else None
+
+def determine_bins(n: int, iqr: float, data_range: float):
     """Determine optimal number of bins for the histogram."""
-    n = len(data)
     if n < 2:
         return 10  # fallback
-    
-    iqr = stats.iqr(data)
+
     if iqr == 0:
         return int(np.ceil(np.log2(n) + 1))  # Sturges
 
     h = 2 * iqr / (n ** (1 / 3))
-    data_range = data.max() - data.min()
-    return int(np.ceil(data_range / h)) if h > 0 else 10
+    return min(MAX_BINS, max(1, int(np.ceil(data_range / h)))) if h > 0 else 10
+
+@dataclass
+class HistogramResult:
+    """Bin counts, a KDE curve and distribution statistics for one column."""
+    column: str
+    counts: np.ndarray
+    edges: np.ndarray
+    kde_x: np.ndarray
+    kde_y: np.ndarray
+    stats: dict
+    shape_notes: list
+
+def resolve_histogram(query: str, profile: DatasetProfile, choose=first_option):
+    """Pick the column to analyze; `choose(label, options)` is called if the query names none."""
+    column = profile.resolver.best_numeric(query)
 
-def plot_histogram(df: pd.DataFrame, query: str = ""):
-    """Create a histogram with distribution analysis."""
-    st.subheader("Histogram Analysis")
-    
-    if df.empty:
-        st.warning("No data available for plotting.")
-        return
+    if not column:
+        numeric_cols = profile.numeric_cols
+        if not numeric_cols:
+            raise ToolError("No numeric columns found in the dataset.")
+        column = choose("Select a numeric column to analyze:", numeric_cols)
+    return {"column": column}
+
+def describe_shape(skew, kurt):
+    """Plain-language notes on skewness and kurtosis."""
+    notes = []
+    if abs(skew) < 0.5:
+        notes.append("The distribution is approximately symmetric.")
+    elif skew > 0:
+        notes.append("The distribution is **right-skewed** (longer tail on the right).")
+    else:
+        notes.append("The distribution is **left-skewed** (longer tail on the left).")
 
-    column = extract_histogram_column(query, df)
+    if abs(kurt) < 0.5:
+        notes.append("The distribution has a **normal-like peak**.")
+    elif kurt > 0:
+        notes.append("The distribution has a **sharper peak** than normal (**leptokurtic**).")
+    else:
+        notes.append("The distribution has a **flatter peak** than normal (**platykurtic**).")
+    return notes
+
+def histogram_from_chunks(chunks, column: str) -> HistogramResult:
+    """Histogram, KDE and statistics of a column delivered in chunks.
+
+    `chunks()` must return a fresh iterable of value arrays each time it is
+    called (e.g. iter_chunks over a memory-mapped column).
+    The first pass accumulates moments and a quantile sketch, which fix the
+    bins and KDE bandwidth; the second pass counts values into the bins and
+    the KDE grid. Memory use is bounded by the chunk size.
+    """
+    moments, sketch = Moments(), QuantileSketch()
+    for chunk in chunks():
+        chunk = finite(chunk)
+        moments.update(chunk)
+        sketch.update(chunk)
+    n = moments.n
+    if n == 0:
+        raise ToolError(f"No valid data points found in column '{column}'.")
+
+    q1, median, q3 = sketch.quantile([0.25, 0.5, 0.75])
+    lo, hi = moments.min, moments.max
+    n_bins = determine_bins(n, q3 - q1, hi - lo)
+    if hi == lo:
+        lo, hi = lo - 0.5, hi + 0.5  # as np.histogram does for constant data
+    edges = np.linspace(lo, hi, n_bins + 1)
+
+    # Scott's rule bandwidth, as scipy's gaussian_kde uses; the grid reaches
+    # four bandwidths past the data so no kernel mass falls off the ends
+    smooth = n > 1 and moments.std > 0
+    bandwidth = moments.std * n ** (-1 / 5) if smooth else 0.0
+    grid_lo = lo - 4 * bandwidth
+    grid_step = (hi - lo + 8 * bandwidth) / (KDE_GRID - 1)
+
+    counts = np.zeros(n_bins, dtype=np.int64)
+    grid_counts = np.zeros(KDE_GRID)
+    for chunk in chunks():
+        chunk = finite(chunk)
+        bins = ((chunk - lo) * (n_bins / (hi - lo))).astype(np.int64)
+        counts += np.bincount(np.clip(bins, 0, n_bins - 1), minlength=n_bins)
+        if smooth:
+            grid_counts += linear_bin(chunk, grid_lo, grid_step, KDE_GRID)
+
+    # KDE scaled to bin counts, evaluated over the data range
+    kde_x, kde_y = np.array([]), np.array([])
+    if smooth:
+        grid = grid_lo + np.arange(KDE_GRID) * grid_step
+        density = binned_kde(grid_counts, grid_step, bandwidth)
+        inside = (grid >= moments.min) & (grid <= moments.max)
+        kde_x, kde_y = grid[inside], density[inside] * n * (edges[1] - edges[0])
 
-    if not column:
-        numeric_cols = df.select_dtypes(include=["float64", "int64", "int32"]).columns
-        if numeric_cols.empty:
-            st.error("No numeric columns found in the dataset.")
-            return
-        column = st.selectbox("Select a numeric column to analyze:", numeric_cols)
-
-    data = df[column].dropna()
-    if data.empty:
-        st.error(f"No valid data points found in column '{column}'.")
-        return
+    stats_data = {
+        "Mean": moments.mean,
+        "Median": float(median),
+        "Standard Deviation": moments.std,
+        "Skewness": moments.skew,
+        "Kurtosis": moments.kurtosis,
+        "Minimum": moments.min,
+        "Maximum": moments.max
+    }
+    notes = describe_shape(stats_data["Skewness"], stats_data["Kurtosis"])
+    return HistogramResult(column, counts, edges, kde_x, kde_y, stats_data, notes)
 
-    n_bins = determine_bins(data)
+def compute_histogram(df: pd.DataFrame, column: str) -> HistogramResult:
+    return histogram_from_chunks(lambda: iter_chunks(df[column]), column)
 
-    # Plotting
-    sns.set(style="whitegrid")
-    fig, ax = plt.subplots(figsize=(10, 6))
+def draw_histogram(result: HistogramResult):
+    """Draw the histogram with its KDE curve and return the figure."""
+    fig, ax = new_figure(figsize=(10, 6))
     honey_color = "#FFB300"
 
-    sns.histplot(data, bins=n_bins, kde=True, color=honey_color, edgecolor='black', ax=ax)
-    ax.set_xlabel(column)
+    ax.bar(result.edges[:-1], result.counts, width=np.diff(result.edges), align="edge",
+           color=honey_color, edgecolor='black', alpha=0.75)
+    if len(result.kde_x):
+        ax.plot(result.kde_x, result.kde_y, color=honey_color)
+    ax.set_xlabel(result.column)
     ax.set_ylabel('Frequency')
-    ax.set_title(f'Distribution of {column}')
-    st.pyplot(fig)
+    ax.set_title(f'Distribution of {result.column}')
+    return fig
+
+def render_histogram(result: HistogramResult, image):
+    """Show a computed histogram and its distribution analysis in Streamlit."""
+    st.image(image)
 
     # Statistics
     st.write("### Distribution Statistics:")
-    stats_data = {
-        "Mean": data.mean(),
-        "Median": data.median(),
-        "Standard Deviation": data.std(),
-        "Skewness": data.skew(),
-        "Kurtosis": data.kurtosis(),
-        "Minimum": data.min(),
-        "Maximum": data.max()
-    }
-    for stat, value in stats_data.items():
+    for stat, value in result.stats.items():
         st.write(f"- **{stat}**: {value:.2f}")
 
     # Shape interpretation
     st.write("### Distribution Shape:")
-    skew = stats_data["Skewness"]
-    kurt = stats_data["Kurtosis"]
+    for note in result.shape_notes:
+        st.write(f"- {note}")
 
-    if abs(skew) < 0.5:
-        st.write("- The distribution is approximately symmetric.")
-    elif skew > 0:
-        st.write("- The distribution is **right-skewed** (longer tail on the right).")
-    else:
-        st.write("- The distribution is **left-skewed** (longer tail on the left).")
+def plot_histogram(df: pd.DataFrame, query: str = "", profile: DatasetProfile = None, memo: ResultMemo = None, dataset_key: str = None, executor=None):
+    """Create a histogram with distribution analysis."""
+    st.subheader("Histogram Analysis")
+    
+    if df.empty:
+        st.warning("No data available for plotting.")
+        return
 
-    if abs(kurt) < 0.5:
-        st.write("- The distribution has a **normal-like peak**.")
-    elif kurt > 0:
-        st.write("- The distribution has a **sharper peak** than normal (**leptokurtic**).")
-    else:
-        st.write("- The distribution has a **flatter peak** than normal (**platykurtic**).")
+    profile = profile or build_profile(df)
+    try:
+        params = resolve_histogram(query, profile, st.selectbox)
+        result, image = run_stages("histogram", df, params, compute_histogram, draw_histogram, memo, dataset_key, executor)
+    except ToolError as e:
+        getattr(st, e.level)(str(e))
+        return
+
+    render_histogram(result, image)
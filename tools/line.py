@@ -1,35 +1,15 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import seaborn as sns
-import matplotlib.pyplot as plt
-import re
-
-def normalize(text):
-    subscripts = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
-    text = text.translate(subscripts)
-    return re.sub(r'[^a-zA-Z0-9]', '', text.lower())
-
-def extract_column_from_query(query: str, df: pd.DataFrame):
-    numeric_cols = df.select_dtypes(include=["float64", "int64"]).columns.tolist()
-    norm_query = normalize(query)
-
-    for col in numeric_cols:
-        if normalize(col) == norm_query:
-            return col
-
-    candidates = [col for col in numeric_cols if normalize(col) in norm_query]
-    if candidates:
-        return max(candidates, key=lambda c: len(normalize(c)))
-    return None
-
-def get_time_column(df: pd.DataFrame):
-    for col in df.columns:
-        if 'date' in col.lower():
-            return col
-    for col in df.columns:
-        if pd.api.types.is_datetime64_any_dtype(df[col]):
-            return col
-    return None
+from dataclasses import dataclass
+from ingest import SAMPLE_ROWS, detect_datetime_format
+from .base import ToolError, first_option
+from .canvas import new_figure
+from .figure_cache import FIGURE_DPI
+from .memo import ResultMemo, run_stages
+from .profile import DatasetProfile, build_profile
+from .rollups import RollupCache, SeriesRollups
 
 def determine_time_aggregation(query: str):
     query = query.lower()
@@ -39,79 +19,183 @@ def determine_time_aggregation(query: str):
         return 'Y'
     return 'D'  # default daily
 
-def find_matching_value(query: str, options: list):
-    """Tries to find a value from options mentioned in the query."""
-    norm_query = normalize(query)
-    for val in options:
-        if normalize(val) in norm_query:
-            return val
-    return None
-
-def plot_line(df: pd.DataFrame, query: str = ""):
-    st.subheader("📈 Trend Over Time")
-
-    y_col = extract_column_from_query(query, df)
+# Warnings shown before asking the user for something the query didn't name
+NOT_DETECTED = {
+    "👉 Select a numeric column": "❗Couldn't detect a numeric column to plot.",
+    "👉 Select a time column": "❗Couldn't detect a date/time column.",
+}
+
+AGG_LABELS = {'D': 'Daily', 'M': 'Monthly', 'Y': 'Yearly'}
+
+# Point markers are only drawn on short series; beyond this they merge into a smear
+MARKER_MAX_POINTS = 120
+
+@dataclass
+class LineResult:
+    """A resampled series ready to plot."""
+    y_col: str
+    time_col: str
+    agg_level: str
+    title: str
+    data: pd.DataFrame
+    group_col: str = None
+    group_value: object = None
+
+def resolve_line(query: str, profile: DatasetProfile, choose=first_option):
+    """Pick the value column, time column, aggregation level and optional series filter."""
+    y_col = profile.resolver.best_numeric(query)
     if not y_col:
-        st.warning("❗Couldn't detect a numeric column to plot.")
-        y_col = st.selectbox("👉 Select a numeric column", df.select_dtypes(include=["float64", "int64"]).columns)
+        y_col = choose("👉 Select a numeric column", profile.numeric_cols)
 
-    time_col = get_time_column(df)
+    time_col = profile.time_col
     if not time_col:
-        st.warning("❗Couldn't detect a date/time column.")
-        time_col = st.selectbox("👉 Select a time column", df.columns)
-    else:
-        st.success(f"✅ Using `{time_col}` as the time axis")
-
-    df[time_col] = pd.to_datetime(df[time_col], errors="coerce")
-    df = df.dropna(subset=[time_col, y_col]).sort_values(time_col)
-
-    agg_level = determine_time_aggregation(query)
-    df.set_index(time_col, inplace=True)
+        time_col = choose("👉 Select a time column", profile.columns)
 
     # ---- smart filtering based on query ----
-    groupby_cols = [col for col in df.reset_index().columns if df.reset_index()[col].nunique() < 100 and df.reset_index()[col].dtype == 'object']
-    selected_group_col = None
-    selected_value = None
-
-    if groupby_cols:
-        for col in groupby_cols:
-            options = df.reset_index()[col].dropna().unique().tolist()
-            match = find_matching_value(query, options)
-            if match:
-                selected_group_col = col
-                selected_value = match
-                break
-
-    if selected_group_col and selected_value:
-        st.info(f"🔍 Showing data for `{selected_value}` in `{selected_group_col}`")
-        df_filtered = df.reset_index()
-        df_filtered = df_filtered[df_filtered[selected_group_col] == selected_value]
-        df_filtered = df_filtered.set_index(time_col)
-        df_agg = df_filtered[[y_col]].resample(agg_level).mean().reset_index()
-        plot_title = f"{y_col} over time ({'Daily' if agg_level=='D' else 'Monthly' if agg_level=='M' else 'Yearly'}) for {selected_value}"
+    group_col = None
+    group_value = None
+
+    hit = profile.value_index.best_match(query, columns=profile.low_cardinality_cols())
+    if hit:
+        group_col = hit.column
+        group_value = hit.value
+
+    return {"y_col": y_col, "time_col": time_col, "agg_level": determine_time_aggregation(query),
+            "group_col": group_col, "group_value": group_value}
+
+def parse_times(times: pd.Series) -> pd.Series:
+    """The column as datetimes. Ingested frames are parsed already; text is parsed with a detected format."""
+    if pd.api.types.is_datetime64_any_dtype(times):
+        return times
+    return pd.to_datetime(times, format=detect_datetime_format(times.head(SAMPLE_ROWS)), errors="coerce")
+
+def line_rollups(df: pd.DataFrame, y_col: str, time_col: str, group_col: str = None) -> SeriesRollups:
+    """Daily/monthly/yearly rollups of `y_col`, split by `group_col` when given."""
+    groups = df[group_col] if group_col else None
+    return SeriesRollups(parse_times(df[time_col]), df[y_col], groups)
+
+def group_rollups(df: pd.DataFrame, y_col: str, time_col: str, group_col: str, group_value) -> SeriesRollups:
+    """Rollups of `y_col` for the rows where `group_col` equals `group_value`.
+
+    Rows are selected with a boolean mask on the original index, so only the
+    matching slice of each column is copied and `df` itself is never touched.
+    """
+    mask = (df[group_col] == group_value).to_numpy()
+    return SeriesRollups(parse_times(df[time_col][mask]), df[y_col][mask])
+
+def compute_line(df: pd.DataFrame, y_col: str, time_col: str, agg_level: str,
+                 group_col: str = None, group_value=None, rollups: SeriesRollups = None) -> LineResult:
+    """Mean of `y_col` per period, optionally for one group; `rollups` may hold a prebuilt line_rollups()."""
+    if not (group_col and group_value):
+        group_col, group_value = None, None
+    if rollups is None:
+        # One-off query: build rollups for just the requested group
+        if group_col:
+            rollups = group_rollups(df, y_col, time_col, group_col, group_value)
+        else:
+            rollups = line_rollups(df, y_col, time_col)
+        series = rollups.series(None, agg_level)
     else:
-        df_agg = df[[y_col]].resample(agg_level).mean().reset_index()
-        plot_title = f"{y_col} over time ({'Daily' if agg_level=='D' else 'Monthly' if agg_level=='M' else 'Yearly'})"
-
-    # ---- plotting ----
-    sns.set_theme(style="whitegrid")
-    fig, ax = plt.subplots(figsize=(10, 5))
+        series = rollups.series(group_value, agg_level)
 
+    df_agg = series.reset_index()
+    if group_col:
+        plot_title = f"{y_col} over time ({AGG_LABELS[agg_level]}) for {group_value}"
+    else:
+        plot_title = f"{y_col} over time ({AGG_LABELS[agg_level]})"
+
+    return LineResult(y_col, time_col, agg_level, plot_title, df_agg, group_col, group_value)
+
+def cached_compute_line(rollups: RollupCache, dataset_key: str):
+    """compute_line taking the series' SeriesRollups from `rollups`, building them on first use.
+
+    One rollup per (dataset, series) serves every group value and aggregation level.
+    """
+    def compute(df, y_col, time_col, agg_level, group_col=None, group_value=None):
+        rollup_group = group_col if group_value else None
+        series_rollups = rollups.get_or_build((dataset_key, time_col, y_col, rollup_group),
+                                              lambda: line_rollups(df, y_col, time_col, rollup_group))
+        return compute_line(df, y_col, time_col, agg_level, group_col, group_value, rollups=series_rollups)
+    return compute
+
+def minmax_downsample(values, max_points: int) -> np.ndarray:
+    """Indices of at most `max_points` values that keep the shape of the series.
+
+    The series is split into equal buckets of consecutive points and each
+    bucket keeps its minimum and maximum (in time order), plus the first and
+    last point overall, so every peak and trough survives. An all-NaN bucket
+    keeps one NaN, which leaves the gap in the drawn line.
+    """
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n)
+    values = np.asarray(values, dtype=np.float64)
+    low = np.where(np.isnan(values), np.inf, values)
+    high = np.where(np.isnan(values), -np.inf, values)
+    edges = np.linspace(0, n, max(1, (max_points - 2) // 2) + 1).astype(np.int64)
+    keep = [0, n - 1]
+    for start, stop in zip(edges[:-1], edges[1:]):
+        keep += [start + low[start:stop].argmin(), start + high[start:stop].argmax()]
+    return np.unique(keep)
+
+def draw_line(result: LineResult):
+    """Draw the trend line and return the figure."""
+    fig, ax = new_figure(figsize=(10, 5))
+
+    # No more points than the saved image has pixels across
+    data = result.data
+    keep = minmax_downsample(data[result.y_col].to_numpy(), int(fig.get_figwidth() * FIGURE_DPI))
+    if len(keep) < len(data):
+        data = data.iloc[keep]
+
+    # The data is already one value per period, so nothing to estimate or bootstrap
     sns.lineplot(
-        data=df_agg,
-        x=time_col,
-        y=y_col,
-        marker="o",
+        data=data,
+        x=result.time_col,
+        y=result.y_col,
+        marker="o" if len(data) <= MARKER_MAX_POINTS else None,
         color="mediumseagreen",
+        estimator=None,
+        errorbar=None,
+        sort=False,
         ax=ax
     )
 
-    ax.set_title(plot_title, fontsize=16, color="#333333", pad=15)
+    ax.set_title(result.title, fontsize=16, color="#333333", pad=15)
     ax.set_xlabel("Time", fontsize=12, color="#444444")
-    ax.set_ylabel(y_col, fontsize=12, color="#444444")
+    ax.set_ylabel(result.y_col, fontsize=12, color="#444444")
 
     ax.tick_params(axis='x', rotation=45, labelcolor="#555555")
     ax.tick_params(axis='y', labelcolor="#555555")
 
     fig.tight_layout()
-    st.pyplot(fig)
+    return fig
+
+def render_line(result: LineResult, image):
+    """Show a computed line chart in Streamlit."""
+    # ---- plotting ----
+    st.image(image)
+
+def plot_line(df: pd.DataFrame, query: str = "", profile: DatasetProfile = None, memo: ResultMemo = None, dataset_key: str = None, executor=None):
+    st.subheader("📈 Trend Over Time")
+
+    profile = profile or build_profile(df)
+
+    def choose(label, options):
+        st.warning(NOT_DETECTED[label])
+        return st.selectbox(label, options)
+
+    params = resolve_line(query, profile, choose)
+    if profile.time_col:
+        st.success(f"✅ Using `{params['time_col']}` as the time axis")
+    if params["group_col"]:
+        st.info(f"🔍 Showing data for `{params['group_value']}` in `{params['group_col']}`")
+
+    compute = cached_compute_line(memo.rollups, dataset_key) if memo is not None and dataset_key else compute_line
+    try:
+        result, image = run_stages("line", df, params, compute, draw_line, memo, dataset_key, executor)
+    except ToolError as e:
+        getattr(st, e.level)(str(e))
+        return
+
+    render_line(result, image)
@@ -0,0 +1,98 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from lru import LRUCache
+
+from .figure_cache import FigureCache, figure_bytes
+from .rollups import RollupCache
+
+# Memory budget for computed results kept across reruns (in megabytes)
+DEFAULT_RESULT_BUDGET_MB = int(os.getenv("CSV_EXPLORER_RESULT_CACHE_MB", "256"))
+
+
+def freeze(value):
+    """Hashable form of a params dict, for use in cache keys."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def result_nbytes(value, _seen=None) -> int:
+    """Approximate in-memory size of a tool result: its frames, arrays and
+    containers, and the attributes of objects such as CoMoments."""
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(result_nbytes(k, seen) + result_nbytes(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(result_nbytes(v, seen) for v in value)
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + result_nbytes(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+class ResultMemo(LRUCache):
+    """LRU of computed tool results bounded by count and total size, with a FigureCache for their rendered images
+    and a RollupCache of the line tool's time-series rollups and the bar tool's
+    grouped aggregates.
+
+    Entries are keyed by (dataset hash, tool, resolved parameters), so asking
+    the same question of the same data again skips both the computation and
+    the drawing.
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = DEFAULT_RESULT_BUDGET_MB * 1024 * 1024,
+                 figures: FigureCache = None, rollups: RollupCache = None):
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes)
+        self.figures = figures if figures is not None else FigureCache()
+        self.rollups = rollups if rollups is not None else RollupCache()
+
+    def sizeof(self, result) -> int:
+        return result_nbytes(result)
+
+    @staticmethod
+    def key(dataset_key: str, tool: str, params: dict):
+        return (dataset_key, tool, freeze(params))
+
+
+def run_stages(tool: str, df, params: dict, compute, draw=None, memo: ResultMemo = None, dataset_key: str = None,
+               executor=None):
+    """Return (result, image bytes) for the tool, reusing what `memo` holds for this exact call.
+
+    The image is None for tools without a draw stage. `executor(tool, df,
+    params, compute, dataset_key)`, when given, runs the compute stage in its
+    place (e.g. executor.ProcessExecutor.run, in a worker process).
+    """
+    key = ResultMemo.key(dataset_key, tool, params)
+    cached = memo is not None and bool(dataset_key)
+
+    result = memo.get(key) if cached else None
+    if result is None:
+        if executor is not None:
+            result = executor(tool, df, params, compute, dataset_key)
+        else:
+            result = compute(df, **params)
+        if cached:
+            memo.put(key, result)
+
+    if draw is None:
+        return result, None
+    if not cached:
+        return result, figure_bytes(draw(result))
+    image = memo.figures.get(key)
+    if image is None:
+        image = memo.figures.render(key, draw(result))
+    return result, image
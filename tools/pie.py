@@ -1,125 +1,115 @@
 import streamlit as st
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-import re
-
-def normalize(text):
-    return re.sub(r'[^a-zA-Z0-9]', '', text.lower())
-
-def extract_column_and_filter(query, df):
-    numeric_cols = df.select_dtypes(include=["float64", "int64", "int32"]).columns.tolist()
-    all_cols = df.columns.tolist()
+from dataclasses import dataclass
+from .base import ToolError, first_option
+from .canvas import new_figure
+from .memo import ResultMemo, run_stages
+from .profile import DatasetProfile, build_profile
 
+def extract_column_and_filter(query, profile: DatasetProfile):
     target_col = None
     filter_key = None
     filter_value = None
 
-    norm_query = normalize(query)
-
-    for col in numeric_cols:
-        if normalize(col) in norm_query:
-            target_col = col
-            break
+    mentioned = profile.resolver.top_columns(query, 1, profile.numeric_cols)
+    if mentioned:
+        target_col = mentioned[0]
 
-    for col in all_cols:
-        if df[col].dtype == "object":
-            for val in df[col].unique():
-                if normalize(str(val)) in norm_query:
-                    filter_key = col
-                    filter_value = val
-                    break
+    hit = profile.value_index.best_match(query)
+    if hit:
+        filter_key = hit.column
+        filter_value = hit.value
 
     return target_col, filter_key, filter_value
 
-def plot_pie(df: pd.DataFrame, query: str = ""):
-    st.subheader("Pie Chart")
+# Pie charts with more slices than this show only the most frequent ones
+MAX_SLICES = 20
+TOP_SLICES = 10
+
+MODE_MESSAGES = {
+    "records": "Query indicates percentage of records. Showing distribution by category.",
+    "categorical": "No numeric column detected. Falling back to categorical frequency plot.",
+}
 
-    col, filter_key, filter_val = extract_column_and_filter(query, df)
+@dataclass
+class PieResult:
+    """Slice labels and sizes for a pie chart."""
+    labels: list
+    values: list
+    title: str
+    truncated: bool = False
 
-    if filter_key and filter_val:
-        df = df[df[filter_key] == filter_val]
-        st.success(f"Filtered data for `{filter_key}` = `{filter_val}`")
+def resolve_pie(query: str, profile: DatasetProfile, choose=first_option):
+    """Decide what to count: records per category, a numeric column's values, or a category's frequencies."""
+    col, filter_key, filter_val = extract_column_and_filter(query, profile)
 
     query_lower = query.lower()
     show_record_counts = "record" in query_lower or "percentage" in query_lower
 
-    if show_record_counts:
-        # Explicitly want record counts
-        possible_group_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
-        st.info("Query indicates percentage of records. Showing distribution by category.")
-        group_col = None
-
-        for col_name in possible_group_cols:
-            if normalize(col_name) in normalize(query):
-                group_col = col_name
-                break
-
-        if not group_col:
-            group_col = st.selectbox("Select a categorical column to count records", possible_group_cols)
-
-        value_counts = df[group_col].value_counts()
-        if len(value_counts) > 20:
-            st.warning("Too many unique values to show in pie chart. Showing top 10 by frequency.")
-            value_counts = value_counts.nlargest(10)
-
-        labels = value_counts.index
-        values = value_counts.values
-        title = f"Distribution of records by `{group_col}`"
+    if show_record_counts or not col:
+        # Explicitly want record counts, or no numeric column — fall back to categorical frequency
+        mode = "records" if show_record_counts else "categorical"
+        possible_group_cols = profile.categorical_cols
+        col = profile.resolver.best(query, possible_group_cols)
 
+        if not col:
+            col = choose("Select a categorical column to count records", possible_group_cols)
     else:
-        if col:
-            # Numeric column found
-            unique_vals = set(df[col].dropna().unique())
-            is_binary = unique_vals.issubset({0, 1})
-
-            if is_binary:
-                if any(key in col.lower() for key in ["sex", "gender"]):
-                    label_map = {0: "Male", 1: "Female"}
-                else:
-                    label_map = {0: "No", 1: "Yes"}
-                mapped_series = df[col].map(label_map)
-                value_counts = mapped_series.value_counts()
-                labels = value_counts.index
-                values = value_counts.values
+        mode = "numeric"
+
+    return {"mode": mode, "column": col, "filter_key": filter_key, "filter_value": filter_val}
+
+def _top_counts(series):
+    value_counts = series.value_counts()
+    # Categorical columns also count categories with no rows (e.g. other cities after a filter)
+    value_counts = value_counts[value_counts > 0]
+    if len(value_counts) > MAX_SLICES:
+        return value_counts.nlargest(TOP_SLICES), True
+    return value_counts, False
+
+def _labels(index: pd.Index) -> list:
+    """Slice labels; float32 values read as written (17.4 rather than 17.399999618530273)."""
+    if index.dtype == np.float32:
+        return [float(str(value)) for value in index.to_numpy()]
+    return index.tolist()
+
+def compute_pie(df: pd.DataFrame, mode: str, column: str, filter_key=None, filter_value=None) -> PieResult:
+    if filter_key and filter_value:
+        df = df[df[filter_key] == filter_value]
+
+    if mode == "numeric":
+        # Numeric column found
+        unique_vals = set(df[column].dropna().unique())
+        is_binary = unique_vals.issubset({0, 1})
+
+        truncated = False
+        if is_binary:
+            if any(key in column.lower() for key in ["sex", "gender"]):
+                label_map = {0: "Male", 1: "Female"}
             else:
-                if df[col].nunique() > 20:
-                    st.warning("Too many unique values to show in pie chart. Showing top 10 by frequency.")
-                    value_counts = df[col].value_counts().nlargest(10)
-                else:
-                    value_counts = df[col].value_counts()
-                labels = value_counts.index
-                values = value_counts.values
-
-            title = f"Pie chart of `{col}`" + (f" in `{filter_val}`" if filter_val else "")
+                label_map = {0: "No", 1: "Yes"}
+            value_counts = df[column].map(label_map).value_counts()
         else:
-            # No numeric column — fallback: treat query as asking for categorical frequency
-            possible_group_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
-
-            st.info("No numeric column detected. Falling back to categorical frequency plot.")
-            group_col = None
-
-            for col_name in possible_group_cols:
-                if normalize(col_name) in normalize(query):
-                    group_col = col_name
-                    break
+            value_counts, truncated = _top_counts(df[column])
 
-            if not group_col:
-                group_col = st.selectbox("Select a categorical column to count records", possible_group_cols)
-
-            value_counts = df[group_col].value_counts()
-            if len(value_counts) > 20:
-                st.warning("Too many unique values to show in pie chart. Showing top 10 by frequency.")
-                value_counts = value_counts.nlargest(10)
+        title = f"Pie chart of `{column}`" + (f" in `{filter_value}`" if filter_value else "")
+    else:
+        value_counts, truncated = _top_counts(df[column])
+        if mode == "records":
+            title = f"Distribution of records by `{column}`"
+        else:
+            title = f"Distribution of `{column}`"
 
-            labels = value_counts.index
-            values = value_counts.values
-            title = f"Distribution of `{group_col}`"
+    return PieResult(_labels(value_counts.index), value_counts.values.tolist(), title, truncated)
 
+def draw_pie(result: PieResult):
+    """Draw the pie chart and return the figure."""
     # Plotting
-    fig, ax = plt.subplots()
+    fig, ax = new_figure()
     wedges, texts, autotexts = ax.pie(
-    values,
-    labels=labels,
+    result.values,
+    labels=result.labels,
     autopct="%1.1f%%",
     startangle=140,
     textprops=dict(fontsize=10),
@@ -127,10 +117,35 @@ def plot_pie(df: pd.DataFrame, query: str = ""):
     labeldistance=1.1     # Move labels slightly outside
 )
 
-    ax.set_title(title, fontsize=12)
+    ax.set_title(result.title, fontsize=12)
     for text in texts:
         text.set_fontsize(10)
     for autotext in autotexts:
         autotext.set_fontsize(9)
+    return fig
+
+def render_pie(result: PieResult, image):
+    """Show a computed pie chart in Streamlit."""
+    if result.truncated:
+        st.warning("Too many unique values to show in pie chart. Showing top 10 by frequency.")
+
+    st.image(image)
+
+def plot_pie(df: pd.DataFrame, query: str = "", profile: DatasetProfile = None, memo: ResultMemo = None, dataset_key: str = None, executor=None):
+    st.subheader("Pie Chart")
+
+    profile = profile or build_profile(df)
+    params = resolve_pie(query, profile, st.selectbox)
+
+    if params["filter_key"] and params["filter_value"]:
+        st.success(f"Filtered data for `{params['filter_key']}` = `{params['filter_value']}`")
+    if params["mode"] in MODE_MESSAGES:
+        st.info(MODE_MESSAGES[params["mode"]])
+
+    try:
+        result, image = run_stages("pie", df, params, compute_pie, draw_pie, memo, dataset_key, executor)
+    except ToolError as e:
+        getattr(st, e.level)(str(e))
+        return
 
-    st.pyplot(fig)
+    render_pie(result, image)
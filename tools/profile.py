@@ -0,0 +1,79 @@
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from .resolver import ColumnResolver, normalize
+from .value_index import ValueIndex
+
+# Bumped whenever DatasetProfile changes shape, so stale saved profiles are rebuilt
+PROFILE_VERSION = 4
+
+# Categorical columns with at most this many distinct values keep their value sets
+MAX_UNIQUE_VALUES = 10_000
+
+# Columns with fewer distinct values than this are offered as series filters
+LOW_CARDINALITY = 100
+
+@dataclass
+class DatasetProfile:
+    """Column metadata computed once per dataset and shared by every tool."""
+    n_rows: int
+    columns: list
+    dtypes: dict
+    numeric_cols: list
+    categorical_cols: list
+    datetime_cols: list
+    cardinality: dict
+    unique_values: dict = field(default_factory=dict)
+    normalized_names: dict = field(default_factory=dict)
+    time_col: str = None
+    value_index: ValueIndex = None
+    resolver: ColumnResolver = None
+
+    def low_cardinality_cols(self, limit: int = LOW_CARDINALITY):
+        """Categorical columns with fewer than `limit` distinct values."""
+        return [col for col in self.categorical_cols if self.cardinality[col] < limit]
+
+
+def _is_categorical(dtype):
+    return (isinstance(dtype, pd.CategoricalDtype)
+            or pd.api.types.is_object_dtype(dtype)
+            or pd.api.types.is_string_dtype(dtype))
+
+
+def _find_time_column(df: pd.DataFrame, datetime_cols: list):
+    for col in df.columns:
+        if 'date' in str(col).lower():
+            return col
+    return datetime_cols[0] if datetime_cols else None
+
+
+def build_profile(df: pd.DataFrame) -> DatasetProfile:
+    """Scan a DataFrame once and collect the metadata the tools need."""
+    numeric_cols = df.select_dtypes(include="number").columns.tolist()
+    datetime_cols = [col for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])]
+    categorical_cols = [col for col in df.columns
+                        if col not in numeric_cols and col not in datetime_cols and _is_categorical(df[col].dtype)]
+
+    cardinality = {col: int(df[col].nunique()) for col in df.columns}
+    unique_values = {
+        col: df[col].dropna().unique().tolist()
+        for col in categorical_cols
+        if cardinality[col] <= MAX_UNIQUE_VALUES
+    }
+
+    resolver = ColumnResolver(df.columns, numeric_cols, categorical_cols)
+    return DatasetProfile(
+        n_rows=len(df),
+        columns=df.columns.tolist(),
+        dtypes=df.dtypes.to_dict(),
+        numeric_cols=numeric_cols,
+        categorical_cols=categorical_cols,
+        datetime_cols=datetime_cols,
+        cardinality=cardinality,
+        unique_values=unique_values,
+        normalized_names=resolver.normalized,
+        time_col=_find_time_column(df, datetime_cols),
+        value_index=ValueIndex(unique_values, normalize),
+        resolver=resolver,
+    )
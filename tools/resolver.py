@@ -0,0 +1,174 @@
+import re
+from collections import defaultdict
+
+from .ahocorasick import AhoCorasick
+
+# Normalization tables, compiled once for every tool
+SUBSCRIPTS = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+NON_ALNUM = re.compile(r'[^a-zA-Z0-9]')
+WORDS = re.compile(r'[a-z0-9]+')
+
+# Column names this short only count when they are a whole query token,
+# so "co" doesn't match inside "compare"
+MIN_EMBEDDED_MENTION = 3
+MIN_PREFIX = 3
+
+# Phrases that introduce the grouping column, with their weights
+GROUPING_PATTERNS = re.compile(
+    r"\b(group by|grouped by|split by|break down by|categorize by|categorized by|per|for each|across|by|in|at)\b"
+)
+GROUPING_SCORES = {
+    "group by": 3, "grouped by": 3, "split by": 3, "break down by": 3,
+    "categorize by": 3, "categorized by": 3,
+    "per": 2, "for each": 2, "across": 2,
+    "by": 1, "in": 1, "at": 1,
+}
+
+# Words in a column name that suggest it holds categories
+CATEGORY_INDICATORS = {
+    "type": 2, "category": 2, "class": 2, "group": 2, "name": 2,
+    "id": 1, "code": 1, "status": 2, "level": 1, "grade": 1,
+}
+
+
+def normalize(text):
+    """Normalize text, including subscript to digit mapping."""
+    if not isinstance(text, str):
+        text = str(text)
+    return NON_ALNUM.sub('', text.translate(SUBSCRIPTS).lower())
+
+
+def _words(text):
+    return WORDS.findall(str(text).translate(SUBSCRIPTS).lower())
+
+
+def _as_set(candidates):
+    if candidates is None or isinstance(candidates, (set, frozenset)):
+        return candidates
+    return set(candidates)
+
+
+class ColumnResolver:
+    """Maps free-text questions to column names.
+
+    Normalized column names go into an Aho-Corasick automaton, and their
+    words and prefixes go into hash indexes. A query is normalized and
+    scanned once. Only the columns it actually hits are scored, so
+    resolution cost depends on the query, not on how wide the table is.
+    """
+
+    def __init__(self, columns, numeric_cols=(), categorical_cols=()):
+        self.columns = list(columns)
+        self.numeric_cols = set(numeric_cols)
+        self.categorical_cols = set(categorical_cols)
+        self._order = {col: i for i, col in enumerate(self.columns)}
+        self.normalized = {col: normalize(col) for col in self.columns}
+
+        self._mentions = AhoCorasick((norm, col) for col, norm in self.normalized.items()).build()
+        self._exact = defaultdict(list)
+        self._words = defaultdict(list)
+        self._prefixes = defaultdict(set)
+        self._prior = {}
+        for col, norm in self.normalized.items():
+            self._exact[norm].append(col)
+            words = set(_words(col))
+            for word in words:
+                self._words[word].append(col)
+            for term in words | {norm}:
+                for end in range(MIN_PREFIX, len(term) + 1):
+                    self._prefixes[term[:end]].add(col)
+            prior = sum(score for word, score in CATEGORY_INDICATORS.items() if word in col.lower())
+            if col in self.categorical_cols and prior:
+                self._prior[col] = prior
+
+    def _tokens(self, query):
+        tokens = [normalize(token) for token in query.split()]
+        return [token for token in tokens if token]
+
+    def mentions(self, query: str, candidates=None):
+        """Columns whose normalized names appear in the query, in the order they are mentioned.
+
+        Overlapping hits keep the longest name, so "no2" wins over "no".
+        Returns (column, start) pairs, where start is an offset into the normalized query.
+        """
+        candidates = _as_set(candidates)
+        tokens = self._tokens(query)
+        boundaries, offset = {0}, 0
+        for token in tokens:
+            offset += len(token)
+            boundaries.add(offset)
+
+        hits = []
+        for start, end, col in self._mentions.find(''.join(tokens)):
+            if candidates is not None and col not in candidates:
+                continue
+            if end - start < MIN_EMBEDDED_MENTION and not (start in boundaries and end in boundaries):
+                continue
+            hits.append((start, end, col))
+
+        taken, chosen = [], {}
+        for start, end, col in sorted(hits, key=lambda hit: (hit[0] - hit[1], hit[0])):
+            if col in chosen or any(start < t_end and t_start < end for t_start, t_end in taken):
+                continue
+            taken.append((start, end))
+            chosen[col] = start
+        return sorted(chosen.items(), key=lambda item: item[1])
+
+    def scores(self, query: str, candidates=None) -> dict:
+        """Score every column the query touches, restricted to `candidates` when given."""
+        candidates = _as_set(candidates)
+        scores = defaultdict(int)
+
+        def allowed(col):
+            return candidates is None or col in candidates
+
+        for col, _ in self.mentions(query, candidates):
+            scores[col] += 3
+        for token in self._tokens(query):
+            for col in self._exact.get(token, ()):
+                if allowed(col):
+                    scores[col] += 3
+            if len(token) >= MIN_PREFIX:
+                for col in self._prefixes.get(token, ()):
+                    if allowed(col):
+                        scores[col] += 1
+        for word in set(_words(query)):
+            for col in self._words.get(word, ()):
+                if allowed(col):
+                    scores[col] += 2
+        return scores
+
+    def _pick(self, scores: dict):
+        if not scores:
+            return None
+        best = max(scores, key=lambda col: (scores[col], len(self.normalized[col]), -self._order[col]))
+        return best if scores[best] > 0 else None
+
+    def best(self, query: str, candidates=None):
+        """The highest scoring column for the query, or None."""
+        return self._pick(self.scores(query, candidates))
+
+    def best_numeric(self, query: str):
+        return self.best(query, self.numeric_cols)
+
+    def best_categorical(self, query: str):
+        """Best grouping column, favouring names that follow "by", "per", "for each" and similar."""
+        candidates = self.categorical_cols
+        scores = self.scores(query, candidates)
+
+        query_lower = query.lower()
+        mentions = self.mentions(query, candidates)
+        for match in GROUPING_PATTERNS.finditer(query_lower):
+            tail_start = len(normalize(query_lower[:match.end()]))
+            bonus = GROUPING_SCORES[match.group(1)] * 2
+            for col, start in mentions:
+                if start >= tail_start:
+                    scores[col] += bonus
+
+        for col, prior in self._prior.items():
+            scores[col] += prior
+        return self._pick(scores)
+
+    def top_columns(self, query: str, k: int = 2, candidates=None):
+        """Up to `k` columns named in the query, in the order they are mentioned."""
+        return [col for col, _ in self.mentions(query, candidates)][:k]
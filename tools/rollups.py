@@ -0,0 +1,121 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from lru import LRUCache
+
+from .groupby import group_codes
+from .streaming import CHUNK_ROWS
+
+
+class SeriesRollups:
+    """Time rollups of one value column, per value of an optional group column.
+
+    A single bincount collects daily sums and counts for every group value;
+    monthly and yearly means are then derived from those on first request and
+    kept, so later questions about the same column become dictionary lookups.
+    """
+
+    def __init__(self, times: pd.Series, values: pd.Series, groups: pd.Series = None):
+        self.time_col = times.name
+        self.y_col = values.name
+        self.group_col = None if groups is None else groups.name
+        self._lock = threading.Lock()
+        self._series = {}  # (group value, level) -> mean per period
+
+        # Daily sums and counts come from np.bincount over day (and group)
+        # numbers read straight from the column buffers. The day numbers are
+        # the one full-length array allocated here (besides the validity mask);
+        # they are turned into bin numbers in place. Tz-aware times are binned
+        # by local calendar day.
+        if getattr(times.dtype, "tz", None) is not None:
+            times = times.dt.tz_localize(None)
+        bins = times.to_numpy(dtype="datetime64[D]").view(np.int64)
+        vals = values.to_numpy() if values.dtype.kind == "f" else values.to_numpy(np.float64, na_value=np.nan)
+        valid = (bins != np.iinfo(np.int64).min) & ~np.isnan(vals)
+        if groups is not None:
+            codes, uniques = group_codes(groups)
+            valid &= codes >= 0
+        self._daily = {}
+        if not valid.any():
+            return
+
+        first = int(np.min(bins, where=valid, initial=np.iinfo(np.int64).max))
+        n_days = int(np.max(bins, where=valid, initial=first)) - first + 1
+        n_groups = 1 if groups is None else len(uniques)
+        if n_groups * n_days > max(len(bins), 1 << 20):
+            # Too many (group, day) cells for a dense grid: fall back to a hashed groupby
+            self._daily = self._grouped_daily(bins, vals, valid, groups)
+            return
+
+        bins -= first
+        if groups is not None:
+            for start in range(0, len(bins), CHUNK_ROWS):  # chunked so the widened codes stay small
+                bins[start:start + CHUNK_ROWS] += codes[start:start + CHUNK_ROWS].astype(np.int64) * n_days
+        bins[~valid] = 0  # counted in cell 0 with zero weight, then taken off its count
+        size = n_groups * n_days
+        sums = np.bincount(bins, weights=np.where(valid, vals, 0), minlength=size).reshape(n_groups, n_days)
+        counts = np.bincount(bins, minlength=size)
+        counts[0] -= len(valid) - np.count_nonzero(valid)
+        counts = counts.reshape(n_groups, n_days)
+        index = pd.DatetimeIndex(np.arange(first, first + n_days).astype("datetime64[D]").astype("datetime64[ns]"),
+                                 name=self.time_col)
+
+        self._daily = {}
+        for g in range(n_groups):
+            present = counts[g] > 0
+            if present.any():
+                key = None if groups is None else uniques[g]
+                self._daily[key] = pd.DataFrame({"sum": sums[g][present], "count": counts[g][present]},
+                                                index=index[present])
+
+    @staticmethod
+    def _grouped_daily(days, vals, valid, groups) -> dict:
+        days = days[valid].astype("datetime64[D]").astype("datetime64[ns]")
+        vals = pd.Series(vals[valid])
+        if groups is None:
+            return {None: vals.groupby(days, sort=True).agg(["sum", "count"])}
+        daily = vals.groupby([groups.to_numpy()[valid], days], sort=True).agg(["sum", "count"])
+        return {value: part.droplevel(0) for value, part in daily.groupby(level=0)}
+
+    @property
+    def groups(self):
+        return list(self._daily)
+
+    def series(self, group_value=None, level: str = "D") -> pd.Series:
+        """Mean of the value column per period (`level` is "D", "M" or "Y"), NaN for empty periods.
+
+        Matches `resample(level).mean()` over the rows of that group.
+        """
+        key = (group_value, level)
+        with self._lock:
+            cached = self._series.get(key)
+        if cached is not None:
+            return cached
+
+        daily = self._daily.get(group_value)
+        if daily is None:
+            series = pd.Series(dtype=np.float64, index=pd.DatetimeIndex([], name=self.time_col), name=self.y_col)
+        else:
+            totals = daily.resample(level).sum()
+            series = (totals["sum"] / totals["count"].where(totals["count"] > 0)).rename(self.y_col)
+            series.index.name = self.time_col
+        with self._lock:
+            self._series[key] = series
+        return series
+
+
+class RollupCache(LRUCache):
+    """LRU of per-dataset precomputations: SeriesRollups keyed by (dataset hash, time
+    column, value column, group column) and GroupCubes keyed by (dataset hash, "groupby", group column)."""
+
+    def __init__(self, max_entries: int = 64):
+        super().__init__(max_entries=max_entries)
+
+    def get_or_build(self, key, builder):
+        rollups = self.get(key)
+        if rollups is None:
+            # Built outside the lock, so other datasets' lookups don't wait on it
+            rollups = self.put(key, builder())
+        return rollups
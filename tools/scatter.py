@@ -1,67 +1,160 @@
 import streamlit as st
 import seaborn as sns
-import matplotlib.pyplot as plt
-import re
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from matplotlib.colors import LogNorm
+from .base import ToolError, first_option
+from .canvas import new_figure
+from .memo import ResultMemo, run_stages
+from .profile import DatasetProfile, build_profile
 
-def normalize(text):
-    """Remove special characters and lowercase the string."""
-    return re.sub(r'[^a-zA-Z0-9]', '', text.lower())
+# Most points ever drawn; larger data is sampled
+MAX_POINTS = 50_000
+# Above this many rows the sample gives way to a 2D density image
+DENSITY_MIN_ROWS = 2_000_000
+# Grid used to stratify the sample, and resolution of the density image
+STRATA_BINS = 32
+DENSITY_BINS = 300
 
-def extract_columns_from_query(query: str, df_columns: list):
-    """Try to extract two column names from the user query using normalization."""
-    query_norm = normalize(query)
-    
-    # First, try exact matches with full column names
-    col_matches = []
-    for col in df_columns:
-        col_norm = normalize(col)
-        if f"{col_norm}" in query_norm:
-            col_matches.append(col)
-    
-    # If we don't have exactly 2 matches, try word-by-word matching
-    if len(col_matches) != 2:
-        col_matches = []
-        words = query.lower().split()
-        for col in df_columns:
-            col_norm = normalize(col)
-            for word in words:
-                word_norm = normalize(word)
-                if word_norm == col_norm:
-                    col_matches.append(col)
-                    break
-            if len(col_matches) == 2:
-                break
-    
-    return col_matches[:2] if len(col_matches) >= 2 else []
+@dataclass
+class ScatterResult:
+    """Points to plot (all of them or a sample), or a 2D density grid for very large data."""
+    x: str
+    y: str
+    points: pd.DataFrame = None
+    density: np.ndarray = None
+    extent: tuple = None
+    n_rows: int = 0
+    method: str = "all points"
+
+def resolve_scatter(query: str, profile: DatasetProfile, choose=first_option):
+    """Pick the x and y columns, suggesting the ones named in the query."""
+    numeric_cols = profile.numeric_cols
+    if len(numeric_cols) < 2:
+        raise ToolError("You need at least two numeric columns to generate a scatter plot.", level="warning")
+
+    col1, col2 = None, None
+    extracted = profile.resolver.top_columns(query, 2, numeric_cols) if query else []
+    if len(extracted) == 2:
+        col1, col2 = extracted
+
+    # Fallback or allow user to adjust
+    x_axis = choose("Select X-axis", numeric_cols, index=numeric_cols.index(col1) if col1 in numeric_cols else 0)
+    y_candidates = [col for col in numeric_cols if col != x_axis]
+    y_axis = choose("Select Y-axis", y_candidates, index=y_candidates.index(col2) if col2 in y_candidates else 0)
+    return {"x": x_axis, "y": y_axis}
+
+def _grid_cells(x, y, bins):
+    """Index of the equal-width (x, y) grid cell each point falls in."""
+    def bucket(v):
+        lo, hi = v.min(), v.max()
+        scale = bins / (hi - lo) if hi > lo else 0.0
+        return np.minimum(((v - lo) * scale).astype(np.int64), bins - 1)
+    return bucket(x) * bins + bucket(y)
+
+def stratified_sample(x, y, size, bins=STRATA_BINS, seed=0):
+    """Indices of about `size` points, spread over an x/y grid and always keeping the extremes.
+
+    Every occupied cell keeps at least one point, so sparse regions and
+    outliers survive; dense cells are thinned in proportion to their counts.
+    """
+    n = len(x)
+    cells = _grid_cells(x, y, bins)
+    order = np.random.default_rng(seed).permutation(n)
+    order = order[np.argsort(cells[order], kind="stable")]  # shuffled within each cell
+    sorted_cells = cells[order]
+    starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+    counts = np.diff(np.r_[starts, n])
+    quota = np.maximum(1, np.round(counts * (size / n))).astype(np.int64)
+    rank = np.arange(n) - np.repeat(starts, counts)
+    keep = order[rank < np.repeat(quota, counts)]
+    extremes = [x.argmin(), x.argmax(), y.argmin(), y.argmax()]
+    return np.union1d(keep, extremes)
+
+def compute_scatter(df: pd.DataFrame, x: str, y: str, mode: str = "auto") -> ScatterResult:
+    """Points for the plot; `mode` is "auto", "points", "sample" or "density".
 
-def plot_scatter(df, query: str = ""):
+    In "auto" mode data up to MAX_POINTS rows is drawn as-is, larger data as a
+    stratified sample and data above DENSITY_MIN_ROWS as a binned density.
+    """
+    xs = df[x].to_numpy(dtype=np.float64, na_value=np.nan)
+    ys = df[y].to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = np.isfinite(xs) & np.isfinite(ys)
+    if not valid.all():
+        xs, ys = xs[valid], ys[valid]
+    n = len(xs)
+    if n == 0:
+        raise ToolError(f"No rows with values in both `{x}` and `{y}`.", level="warning")
+
+    if mode == "auto":
+        mode = "points" if n <= MAX_POINTS else "sample" if n <= DENSITY_MIN_ROWS else "density"
+
+    if mode == "density":
+        density, x_edges, y_edges = np.histogram2d(xs, ys, bins=DENSITY_BINS)
+        extent = (x_edges[0], x_edges[-1], y_edges[0], y_edges[-1])
+        method = f"density of {n:,} points in {DENSITY_BINS}×{DENSITY_BINS} bins"
+        return ScatterResult(x, y, density=density.T, extent=extent, n_rows=n, method=method)
+
+    if mode == "sample" and n > MAX_POINTS:
+        idx = stratified_sample(xs, ys, MAX_POINTS)
+        xs, ys = xs[idx], ys[idx]
+        method = (f"{len(idx):,} of {n:,} points, stratified over a "
+                  f"{STRATA_BINS}×{STRATA_BINS} grid with extremes kept")
+    else:
+        method = "all points"
+    return ScatterResult(x, y, pd.DataFrame({x: xs, y: ys}), n_rows=n, method=method)
+
+def draw_scatter(result: ScatterResult):
+    """Draw the scatter plot (or density image) and return the figure."""
+    fig, ax = new_figure()
+    if result.density is not None:
+        image = ax.imshow(np.ma.masked_equal(result.density, 0), origin="lower", extent=result.extent,
+                          aspect="auto", cmap="viridis", norm=LogNorm(), interpolation="nearest")
+        fig.colorbar(image, ax=ax, label="points per bin")
+        ax.grid(False)
+    elif result.method == "all points":
+        # Plot using seaborn
+        sns.scatterplot(data=result.points, x=result.x, y=result.y, ax=ax, color="skyblue", edgecolor="black", alpha=0.7)
+    else:
+        # Without per-point edges, drawing cost stays flat as the sample grows
+        ax.scatter(result.points[result.x], result.points[result.y], s=6, color="skyblue", alpha=0.5,
+                   linewidths=0, rasterized=True)
+    ax.set_xlabel(result.x)
+    ax.set_ylabel(result.y)
+    title = f"{result.y} vs {result.x}"
+    if result.method != "all points":
+        title += f"\nShowing {result.method}"
+    ax.set_title(title)
+    return fig
+
+def render_scatter(result: ScatterResult, image):
+    """Show a computed scatter plot in Streamlit."""
+    if result.method != "all points":
+        st.info(f"{result.n_rows:,} rows: showing {result.method}.")
+    st.image(image)
+
+def plot_scatter(df, query: str = "", profile: DatasetProfile = None, memo: ResultMemo = None, dataset_key: str = None, executor=None):
     st.subheader("Scatter Plot")
     
     # Get numeric columns only
-    numeric_cols = df.select_dtypes(include=["float64", "int64"]).columns.tolist()
-
-    if len(numeric_cols) < 2:
-        st.warning("You need at least two numeric columns to generate a scatter plot.")
-        return
+    profile = profile or build_profile(df)
+    numeric_cols = profile.numeric_cols
 
     # Attempt to auto-select from query
-    col1, col2 = None, None
-    if query:
-        extracted = extract_columns_from_query(query, numeric_cols)
+    if query and len(numeric_cols) >= 2:
+        extracted = profile.resolver.top_columns(query, 2, numeric_cols)
         if len(extracted) == 2:
-            col1, col2 = extracted
-            st.success(f"Identified columns from query: `{col1}` vs `{col2}`")
+            st.success(f"Identified columns from query: `{extracted[0]}` vs `{extracted[1]}`")
         else:
             st.warning(f"Could not identify both columns from query: '{query}'")
             st.info(f"Available numeric columns: {', '.join(numeric_cols)}")
 
-    # Fallback or allow user to adjust
-    x_axis = st.selectbox("Select X-axis", numeric_cols, index=numeric_cols.index(col1) if col1 in numeric_cols else 0)
-    y_candidates = [col for col in numeric_cols if col != x_axis]
-    y_axis = st.selectbox("Select Y-axis", y_candidates, index=y_candidates.index(col2) if col2 in y_candidates else 0)
+    try:
+        params = resolve_scatter(query, profile, st.selectbox)
+        result, image = run_stages("scatter", df, params, compute_scatter, draw_scatter, memo, dataset_key, executor)
+    except ToolError as e:
+        getattr(st, e.level)(str(e))
+        return
 
-    # Plot using seaborn
-    fig, ax = plt.subplots()
-    sns.scatterplot(data=df, x=x_axis, y=y_axis, ax=ax, color="skyblue", edgecolor="black", alpha=0.7)
-    ax.set_title(f"{y_axis} vs {x_axis}")
-    st.pyplot(fig)
+    render_scatter(result, image)
@@ -0,0 +1,343 @@
+"""Mergeable one-pass statistics for data that arrives in chunks.
+
+Each accumulator has `update(values)` for a chunk of values and
+`merge(other)` to combine partial results, so the same code runs over an
+in-memory column, a memory-mapped Arrow file or a chunked CSV reader.
+"""
+import numpy as np
+
+# Rows per chunk when iterating over an in-memory or memory-mapped array
+CHUNK_ROWS = 1_000_000
+
+
+def iter_chunks(values, chunk_rows: int = CHUNK_ROWS):
+    """Yield successive float64 slices of `values` (array, Series or memory-mapped column).
+
+    Only one slice is converted at a time (missing values become NaN), so a
+    narrower column is never copied whole.
+    """
+    series = hasattr(values, "iloc")
+    for start in range(0, len(values), chunk_rows):
+        if series:
+            yield values.iloc[start:start + chunk_rows].to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            yield np.asarray(values[start:start + chunk_rows], dtype=np.float64)
+
+
+def iter_frame_chunks(df, columns, chunk_rows: int = CHUNK_ROWS):
+    """Yield successive row blocks of `df[columns]` as 2D float64 arrays (NaN for missing)."""
+    for start in range(0, len(df), chunk_rows):
+        block = df.iloc[start:start + chunk_rows]
+        yield np.column_stack([block[c].to_numpy(dtype=np.float64, na_value=np.nan) for c in columns])
+
+
+def finite(chunk) -> np.ndarray:
+    """The chunk as float64 with NaN/inf dropped."""
+    chunk = np.asarray(chunk, dtype=np.float64)
+    mask = np.isfinite(chunk)
+    return chunk if mask.all() else chunk[mask]
+
+
+class Moments:
+    """Count, min, max and the first four central moments, merged chunk by chunk.
+
+    Uses the pairwise update of Chan et al. / Pébay, so results match a
+    single pass over all the data up to floating point rounding.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, chunk):
+        chunk = finite(chunk)
+        if len(chunk) == 0:
+            return self
+        other = Moments()
+        other.n = len(chunk)
+        other.mean = float(chunk.mean())
+        d = chunk - other.mean
+        d2 = d * d
+        other.m2 = float(d2.sum())
+        other.m3 = float((d2 * d).sum())
+        other.m4 = float((d2 * d2).sum())
+        other.min = float(chunk.min())
+        other.max = float(chunk.max())
+        return self.merge(other)
+
+    def merge(self, other: "Moments"):
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        delta_n = delta / n
+        m2 = self.m2 + other.m2 + delta * delta_n * na * nb
+        m3 = (self.m3 + other.m3 + delta * delta_n ** 2 * na * nb * (na - nb)
+              + 3 * delta_n * (na * other.m2 - nb * self.m2))
+        m4 = (self.m4 + other.m4 + delta * delta_n ** 3 * na * nb * (na * na - na * nb + nb * nb)
+              + 6 * delta_n ** 2 * (na * na * other.m2 + nb * nb * self.m2)
+              + 4 * delta_n * (na * other.m3 - nb * self.m3))
+        self.n, self.mean, self.m2, self.m3, self.m4 = n, self.mean + delta_n * nb, m2, m3, m4
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    @property
+    def var(self) -> float:
+        """Sample variance (ddof=1), as pandas reports it."""
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.var))
+
+    @property
+    def skew(self) -> float:
+        """Bias-corrected skewness, matching pandas' Series.skew()."""
+        n = self.n
+        if n < 3 or self.m2 == 0:
+            return np.nan if n < 3 else 0.0
+        g1 = np.sqrt(n) * self.m3 / self.m2 ** 1.5
+        return float(g1 * np.sqrt(n * (n - 1)) / (n - 2))
+
+    @property
+    def kurtosis(self) -> float:
+        """Bias-corrected excess kurtosis, matching pandas' Series.kurtosis()."""
+        n = self.n
+        if n < 4 or self.m2 == 0:
+            return np.nan if n < 4 else 0.0
+        g2 = n * self.m4 / self.m2 ** 2 - 3
+        return float(((n + 1) * g2 + 6) * (n - 1) / ((n - 2) * (n - 3)))
+
+
+class QuantileSketch:
+    """Merging t-digest: approximate quantiles in bounded memory.
+
+    Values are kept as weighted centroids. After each update the centroids are
+    regrouped so that a cluster spans at most one unit of the arcsine scale
+    function, which keeps clusters small near the tails (q close to 0 or 1)
+    and the number of centroids around `compression`. Up to 20 x compression
+    values are buffered as-is before the first regrouping.
+    """
+
+    def __init__(self, compression: int = 200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, chunk):
+        chunk = np.sort(finite(chunk))
+        if len(chunk):
+            self._merge_sorted(chunk, np.ones(len(chunk)))
+        return self
+
+    def merge(self, other: "QuantileSketch"):
+        if len(other.means):
+            self._merge_sorted(other.means, other.weights)
+        return self
+
+    def _merge_sorted(self, means, weights):
+        # Slot the (few) existing centroids into the sorted values instead of re-sorting everything
+        at = np.searchsorted(means, self.means)
+        self._compress(np.insert(means, at, self.means), np.insert(weights, at, self.weights))
+
+    def _compress(self, means, weights):
+        if len(means) <= 20 * self.compression:
+            # Small inputs stay as raw values, which keeps their quantiles exact
+            self.means, self.weights = means, weights
+            return
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = np.floor(self.compression * (np.arcsin(2 * q - 1) / np.pi + 0.5)).astype(np.int64)
+        groups = np.concatenate([[0], np.cumsum(k[1:] != k[:-1])])  # k is non-decreasing
+        merged_weights = np.bincount(groups, weights=weights)
+        self.means = np.bincount(groups, weights=means * weights) / merged_weights
+        self.weights = merged_weights
+
+    def quantile(self, q):
+        """Approximate quantile(s) for q in [0, 1], interpolating between centroid midpoints."""
+        if not len(self.means):
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        centers = (np.cumsum(self.weights) - self.weights / 2) / self.count
+        return np.interp(q, centers, self.means)
+
+
+class ReservoirSample:
+    """Uniform sample of at most `size` values from a stream of chunks.
+
+    Every value gets an independent random key and the `size` values with the
+    smallest keys are kept (bottom-k sampling), which is a reservoir sample
+    that can be filled a chunk at a time and merged across partial streams.
+    """
+
+    def __init__(self, size: int, seed: int = 0):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.values = np.empty(0)
+        self.keys = np.empty(0)
+        self.seen = 0
+
+    def update(self, chunk):
+        chunk = finite(chunk)
+        self.seen += len(chunk)
+        keys = self.rng.random(len(chunk))
+        if len(self.keys) == self.size:
+            # Once full, only values whose key beats the largest kept key can get in
+            entering = keys < self.keys.max()
+            chunk, keys = chunk[entering], keys[entering]
+        return self._keep(np.concatenate([self.values, chunk]), np.concatenate([self.keys, keys]))
+
+    def merge(self, other: "ReservoirSample"):
+        self.seen += other.seen
+        return self._keep(np.concatenate([self.values, other.values]), np.concatenate([self.keys, other.keys]))
+
+    def _keep(self, values, keys):
+        if len(values) > self.size:
+            keep = np.argpartition(keys, self.size - 1)[:self.size]
+            values, keys = values[keep], keys[keep]
+        self.values, self.keys = values, keys
+        return self
+
+    def quantile(self, q):
+        return np.quantile(self.values, q) if len(self.values) else np.full(np.shape(q), np.nan)
+
+    def quantile_bounds(self, q, alpha: float = 0.05):
+        """(low, high) values bracketing the population quantile(s) with probability 1 - alpha.
+
+        Uses the Dvoretzky-Kiefer-Wolfowitz bound: the sample CDF is within
+        eps = sqrt(ln(2 / alpha) / (2 n)) of the true CDF everywhere, so the
+        true q-quantile lies between the sample's (q - eps) and (q + eps) quantiles.
+        """
+        eps = dkw_epsilon(len(self.values), alpha)
+        q = np.asarray(q, dtype=np.float64)
+        return self.quantile(np.clip(q - eps, 0, 1)), self.quantile(np.clip(q + eps, 0, 1))
+
+
+def dkw_epsilon(n: int, alpha: float = 0.05) -> float:
+    """Largest CDF error of an n-value sample at confidence 1 - alpha (DKW inequality)."""
+    return float(np.sqrt(np.log(2 / alpha) / (2 * n))) if n else 1.0
+
+
+class CoMoments:
+    """Pairwise-complete sums and cross-products of several columns, for correlation matrices.
+
+    For each pair of columns (i, j) it keeps, over the rows where both are
+    present, the count, sum of column i, sum of squares of column i and the
+    sum of products. The matrix can then be built, or extended with appended
+    rows, without revisiting earlier chunks. Values are shifted by the first
+    chunk's column means to keep the sums well conditioned.
+    """
+
+    def __init__(self, n_columns: int):
+        p = n_columns
+        self.shift = None
+        self.n = np.zeros((p, p))
+        self.sum = np.zeros((p, p))     # [i, j]: sum of column i where i and j are present
+        self.sum_sq = np.zeros((p, p))  # [i, j]: sum of squares of column i, same rows
+        self.cross = np.zeros((p, p))   # [i, j]: sum of column i * column j
+
+    def update(self, chunk):
+        """Add a block of rows (2D array, one column per variable, NaN for missing)."""
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if not len(chunk):
+            return self
+        if self.shift is None:
+            with np.errstate(all="ignore"):
+                self.shift = np.nan_to_num(np.nanmean(chunk, axis=0))
+        x = chunk - self.shift
+        present = np.isfinite(x)
+        if present.all():
+            # No missing values: every pair sees every row, so one product suffices
+            self.n += len(x)
+            self.sum += x.sum(axis=0)[:, None]
+            self.sum_sq += (x * x).sum(axis=0)[:, None]
+        else:
+            x = np.where(present, x, 0.0)
+            mask = present.astype(np.float64)
+            self.n += mask.T @ mask
+            self.sum += x.T @ mask
+            self.sum_sq += (x * x).T @ mask
+        self.cross += x.T @ x
+        return self
+
+    def merge(self, other: "CoMoments"):
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.__dict__.update({k: np.copy(v) for k, v in other.__dict__.items()})
+            return self
+        # Re-express the other side's sums around this side's shift
+        d = other.shift - self.shift
+        sum_i = other.sum + other.n * d[:, None]
+        self.sum_sq += other.sum_sq + 2 * d[:, None] * other.sum + other.n * d[:, None] ** 2
+        self.cross += (other.cross + d[:, None] * other.sum.T + d[None, :] * other.sum
+                       + other.n * d[:, None] * d[None, :])
+        self.sum += sum_i
+        self.n += other.n
+        return self
+
+    def correlation(self) -> np.ndarray:
+        """Pearson correlation matrix over pairwise-complete rows (NaN where undefined)."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            n = self.n
+            cov = self.cross - self.sum * self.sum.T / n
+            var_i = self.sum_sq - self.sum ** 2 / n
+            corr = cov / np.sqrt(var_i * var_i.T)
+        corr[n < 2] = np.nan
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(np.diag(var_i) > 0, 1.0, np.nan))
+        return corr
+
+
+def top_pairs(matrix, k: int = 5):
+    """(i, j) index pairs of the k largest |values| in the strict upper triangle, largest first."""
+    rows, cols = np.triu_indices(len(matrix), 1)
+    values = np.abs(matrix[rows, cols])
+    values = np.where(np.isnan(values), -1.0, values)
+    k = min(k, int((values >= 0).sum()))
+    if k == 0:
+        return []
+    best = np.argpartition(-values, k - 1)[:k]
+    best = best[np.argsort(-values[best], kind="stable")]
+    return list(zip(rows[best].tolist(), cols[best].tolist()))
+
+
+def binned_kde(counts, grid_step: float, bandwidth: float):
+    """Gaussian KDE of linearly binned counts by FFT convolution.
+
+    Returns the density (integrating to 1) at each grid point; cost is
+    O(G log G) in the grid size, independent of the number of values.
+    """
+    n = counts.sum()
+    if n == 0 or bandwidth <= 0:
+        return np.zeros_like(counts, dtype=np.float64)
+    half = min(len(counts) - 1, int(np.ceil(4 * bandwidth / grid_step)))
+    offsets = np.arange(-half, half + 1) * grid_step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    size = len(counts) + len(kernel) - 1
+    fft_size = 1 << (size - 1).bit_length()
+    smoothed = np.fft.irfft(np.fft.rfft(counts, fft_size) * np.fft.rfft(kernel, fft_size), fft_size)
+    return np.maximum(smoothed[half:half + len(counts)], 0.0) / n
+
+
+def linear_bin(chunk, lo: float, step: float, size: int):
+    """Spread each value over its two nearest grid points (linear binning)."""
+    pos = (finite(chunk) - lo) / step
+    pos = pos[(pos >= 0) & (pos <= size - 1)]
+    left = np.floor(pos).astype(np.int64)
+    frac = pos - left
+    right = np.minimum(left + 1, size - 1)
+    return (np.bincount(left, weights=1 - frac, minlength=size)
+            + np.bincount(right, weights=frac, minlength=size))
@@ -1,13 +1,139 @@
 # Summary tool
 import streamlit as st
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from .base import ToolError
+from .memo import ResultMemo, run_stages
+from .streaming import CHUNK_ROWS, Moments, QuantileSketch, ReservoirSample, dkw_epsilon, finite, iter_chunks
 
-def show_summary(df,query):
-    print("entered show summary")
+# Percentiles reported alongside the moments, as describe() does
+PERCENTILES = [0.25, 0.5, 0.75]
+# Rows in the reservoir sample used for percentiles in approximate mode
+SAMPLE_ROWS = 100_000
+# Frames at least this long are summarized from a sample unless the query asks for exact figures
+APPROX_MIN_ROWS = 20_000_000
+APPROX_WORDS = ["approx", "quick", "rough", "estimate", "sample"]
+
+@dataclass
+class SummaryResult:
+    """Shape, dtypes, describe()-style statistics and null counts of a frame.
+
+    Datetime columns get their statistics in `date_statistics`, formatted as
+    text, so every frame holds a single type per column and Arrow can
+    serialize it for st.write. In approximate mode the percentiles come from a `sample_size`-row
+    reservoir sample and `margins` holds, per column, the half-width of the
+    95% DKW interval around each percentile.
+    """
+    shape: tuple
+    dtypes: pd.Series
+    statistics: pd.DataFrame
+    missing: pd.Series
+    sample_size: int = None
+    margins: pd.DataFrame = None
+    date_statistics: pd.DataFrame = None
+
+def resolve_summary(query, profile=None, choose=None):
+    """Summarize from a sample when the query asks for an approximate summary or the frame is huge."""
+    query = (query or "").lower()
+    approximate = any(word in query for word in APPROX_WORDS)
+    if profile is not None and profile.n_rows >= APPROX_MIN_ROWS and "exact" not in query:
+        approximate = True
+    return {"sample_rows": SAMPLE_ROWS} if approximate else {}
+
+def column_statistics(values, sample_rows: int = None):
+    """(describe()-style statistics, percentile margins or None) of one numeric column in one pass.
+
+    `values` is an array or Series; it is converted to float64 a chunk at a time.
+
+    Count, mean, std, min and max are exact; percentiles come from a quantile
+    sketch, or from a reservoir sample of `sample_rows` values when given.
+    """
+    moments = Moments()
+    percentiles = ReservoirSample(sample_rows) if sample_rows else QuantileSketch()
+    for chunk in iter_chunks(values):
+        moments.update(chunk)
+        percentiles.update(chunk)
+
+    empty = moments.n == 0
+    if empty:
+        quantiles = np.full(len(PERCENTILES), np.nan)
+    elif len(values) <= CHUNK_ROWS and not sample_rows:
+        # A single chunk is sorted whole anyway, so its percentiles may as well be exact
+        quantiles = np.quantile(finite(next(iter_chunks(values))), PERCENTILES)
+    else:
+        quantiles = percentiles.quantile(PERCENTILES)
+    stats = [moments.n, np.nan if empty else moments.mean, moments.std if moments.n > 1 else np.nan,
+             np.nan if empty else moments.min, *quantiles, np.nan if empty else moments.max]
+
+    margins = None
+    if sample_rows and not empty:
+        low, high = percentiles.quantile_bounds(PERCENTILES)
+        margins = np.maximum(quantiles - low, high - quantiles)
+    return stats, margins
+
+def compute_summary(df, sample_rows: int = None) -> SummaryResult:
+    """Summary of the frame, streaming over each numeric column once.
+
+    With `sample_rows`, percentiles are estimated from a reservoir sample of
+    that many values per column instead of a sketch of all of them.
+    """
+    index = ["count", "mean", "std", "min", *(f"{q:.0%}" for q in PERCENTILES), "max"]
+    numeric = df.select_dtypes(include=["number", "datetime"]).columns
+    if len(numeric) == 0:
+        # Nothing to stream: describe() summarizes the text columns instead
+        return SummaryResult(df.shape, df.dtypes.astype(str), df.describe().astype(str), len(df) - df.count())
+
+    statistics, date_statistics, margins = {}, {}, {}
+    for column in numeric:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            # Stream nanoseconds since the epoch, then report them back as timestamps
+            times = df[column].dt.tz_localize(None) if df[column].dt.tz else df[column]
+            nanos = times.to_numpy(dtype="datetime64[ns]").view(np.int64).astype(np.float64)
+            nanos[times.isna().to_numpy()] = np.nan
+            stats, margin = column_statistics(nanos, sample_rows)
+            times = pd.to_datetime(stats[1:2] + [np.nan] + stats[3:])
+            date_statistics[column] = [f"{stats[0]:,}", *("" if pd.isna(t) else str(t) for t in times)]
+            margins[column] = None if margin is None else pd.to_timedelta(margin)
+        else:
+            statistics[column], margins[column] = column_statistics(df[column], sample_rows)
+
+    statistics = pd.DataFrame(statistics, index=index, dtype=np.float64)
+    date_statistics = pd.DataFrame(date_statistics, index=index) if date_statistics else None
+    dtypes, missing = df.dtypes.astype(str), len(df) - df.count()
+    if sample_rows and len(df) > sample_rows:
+        margins = pd.DataFrame({c: m for c, m in margins.items() if m is not None}, index=index[4:-1])
+        return SummaryResult(df.shape, dtypes, statistics, missing, sample_rows, margins, date_statistics)
+    return SummaryResult(df.shape, dtypes, statistics, missing, date_statistics=date_statistics)
+
+def render_summary(result: SummaryResult, image=None):
+    """Show a computed summary in Streamlit."""
     st.subheader("DataFrame Summary")
-    st.write("**Shape of the DataFrame:**", df.shape)
+    st.write("**Shape of the DataFrame:**", result.shape)
     st.write("**Data Types:**")
-    st.write(df.dtypes)
-    st.write("**Summary Statistics:**")
-    st.write(df.describe())
+    st.write(result.dtypes)
+    if len(result.statistics.columns):
+        st.write("**Summary Statistics:**")
+        st.write(result.statistics)
+    if result.date_statistics is not None:
+        st.write("**Date Statistics:**")
+        st.write(result.date_statistics)
+    if result.sample_size:
+        st.caption(f"Percentiles estimated from a {result.sample_size:,}-row random sample per column "
+                   f"(±{dkw_epsilon(result.sample_size):.2%} in rank at 95% confidence); "
+                   "count, mean, std, min and max are exact.")
+        st.write("**Percentile margins (±, 95%):**")
+        st.write(result.margins)
     st.write("**Missing Values:**")
-    st.write(df.isnull().sum())
+    st.write(result.missing)
+
+def show_summary(df, query, profile=None, memo: ResultMemo = None, dataset_key: str = None, executor=None):
+    print("entered show summary")
+    params = resolve_summary(query, profile)
+    try:
+        result, image = run_stages("summary", df, params, compute_summary, None, memo, dataset_key, executor)
+    except ToolError as e:
+        getattr(st, e.level)(str(e))
+        return
+
+    render_summary(result, image)
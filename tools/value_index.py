@@ -0,0 +1,40 @@
+from collections import namedtuple
+
+from .ahocorasick import AhoCorasick
+
+ValueHit = namedtuple("ValueHit", ["column", "value", "start", "end"])
+
+
+class ValueIndex:
+    """Normalized categorical values of a dataset, matched against queries in one pass.
+
+    Built once per dataset from the profile's value sets. A query is
+    normalized once and scanned once, returning every (column, value) whose
+    normalized form occurs in it.
+    """
+
+    def __init__(self, unique_values: dict, normalize):
+        self._normalize = normalize
+        self._matcher = AhoCorasick()
+        self._order = {}
+        for col, values in unique_values.items():
+            for val in values:
+                self._matcher.add(normalize(val), (col, val))
+                self._order[(col, val)] = len(self._order)
+        # Built now, while the index is private: the profile holding it is shared between sessions
+        self._matcher.build()
+
+    def find(self, query: str, columns=None):
+        """All value hits in `query`, optionally restricted to `columns`."""
+        hits = []
+        for start, end, (col, val) in self._matcher.find(self._normalize(query)):
+            if columns is None or col in columns:
+                hits.append(ValueHit(col, val, start, end))
+        return hits
+
+    def best_match(self, query: str, columns=None):
+        """The most specific hit: the longest match, ties broken by dataset order."""
+        hits = self.find(query, columns)
+        if not hits:
+            return None
+        return min(hits, key=lambda hit: (hit.start - hit.end, self._order[(hit.column, hit.value)]))
@@ -0,0 +1,103 @@
+"""Train and evaluate the local query classifier used by router.py.
+
+    python train_router.py [--data router_queries.csv] [--out router_model.json]
+
+Reports held-out accuracy over all queries, accuracy on the queries the
+classifier is confident about, and the fraction that would still go to the
+LLM at the router's confidence threshold. The final model is refit on all
+labelled queries before it is saved.
+"""
+import argparse
+import csv
+import time
+import zlib
+
+import numpy as np
+from scipy import sparse
+
+from query_classifier import N_BUCKETS, QueryClassifier, featurize
+from router import CLASSIFIER_THRESHOLD, TOOLS
+
+
+def load_examples(path: str):
+    with open(path, newline="") as f:
+        return [(row["query"], row["tool"]) for row in csv.DictReader(f)]
+
+
+def design_matrix(queries):
+    rows, cols = [], []
+    for i, query in enumerate(queries):
+        buckets = featurize(query)
+        rows += [i] * len(buckets)
+        cols += buckets
+    data = np.ones(len(rows), dtype=np.float64)
+    return sparse.csr_matrix((data, (rows, cols)), shape=(len(queries), N_BUCKETS))
+
+
+def fit(queries, labels, classes, epochs=300, lr=0.5, l2=1e-4):
+    """Softmax regression by full-batch gradient descent on sparse hashed features."""
+    X = design_matrix(queries)
+    used = np.unique(X.indices)
+    X = X[:, used]  # train only on buckets that occur
+    y = np.array([classes.index(label) for label in labels])
+    Y = np.eye(len(classes))[y]
+    W = np.zeros((X.shape[1], len(classes)))
+    b = np.zeros(len(classes))
+    for _ in range(epochs):
+        logits = X @ W + b
+        logits -= logits.max(axis=1, keepdims=True)
+        P = np.exp(logits)
+        P /= P.sum(axis=1, keepdims=True)
+        G = (P - Y) / len(y)
+        W -= lr * (X.T @ G + l2 * W)
+        b -= lr * G.sum(axis=0)
+    weights = {int(bucket): W[i].tolist() for i, bucket in enumerate(used) if np.abs(W[i]).max() > 1e-3}
+    return QueryClassifier(classes, b.tolist(), weights)
+
+
+def split(examples, test_fraction=0.2):
+    """Deterministic train/test split by hashing each query."""
+    train, test = [], []
+    for query, tool in examples:
+        (test if zlib.crc32(query.encode()) % 100 < test_fraction * 100 else train).append((query, tool))
+    return train, test
+
+
+def evaluate(model, examples, threshold):
+    confident = correct = confident_correct = 0
+    start = time.perf_counter()
+    for query, tool in examples:
+        predicted, confidence = model.predict(query)
+        correct += predicted == tool
+        if confidence >= threshold:
+            confident += 1
+            confident_correct += predicted == tool
+    per_query_us = (time.perf_counter() - start) / max(len(examples), 1) * 1e6
+    n = max(len(examples), 1)
+    print(f"  queries:                 {len(examples)}")
+    print(f"  accuracy (all):          {correct / n:.1%}")
+    print(f"  accuracy (confident):    {confident_correct / max(confident, 1):.1%}")
+    print(f"  sent to LLM (< {threshold:.2f}): {1 - confident / n:.1%}")
+    print(f"  prediction latency:      {per_query_us:.0f} us/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default="router_queries.csv")
+    parser.add_argument("--out", default="router_model.json")
+    parser.add_argument("--threshold", type=float, default=CLASSIFIER_THRESHOLD)
+    args = parser.parse_args()
+
+    examples = load_examples(args.data)
+    train, test = split(examples)
+    model = fit([q for q, _ in train], [t for _, t in train], TOOLS)
+    print("Held-out evaluation:")
+    evaluate(model, test, args.threshold)
+
+    model = fit([q for q, _ in examples], [t for _, t in examples], TOOLS)
+    model.save(args.out)
+    print(f"Saved model trained on {len(examples)} queries to {args.out} ({len(model.weights)} active buckets)")
+
+
+if __name__ == "__main__":
+    main()